@@ -0,0 +1,117 @@
+import random
+from dataclasses import dataclass
+from itertools import accumulate
+from typing import Any, Callable, Dict, List, Tuple
+
+from join_algorithms.base import BaseDataset
+
+
+@dataclass(frozen=True)
+class BuildRow:
+    key: Any
+    payload: str
+
+
+@dataclass(frozen=True)
+class ProbeRow:
+    key: Any
+    value: float
+
+
+@dataclass(frozen=True)
+class JoinedRow:
+    key: Any
+    payload: str
+    value: float
+
+
+KEY_TYPES = ("int", "str")
+
+
+def _encode_keys(keys: List[int], key_type: str) -> List[Any]:
+    if key_type == "int":
+        return keys
+    if key_type == "str":
+        # long-ish string ids, similar to the "abc123"-style keys seen in practice
+        return [f"id-{k:012d}-{k * 2654435761 % 4294967296:08x}" for k in keys]
+    raise ValueError(f"key_type must be one of {KEY_TYPES}, got {key_type!r}")
+
+
+def _uniform(rng: random.Random, rows: int) -> Tuple[List[int], List[int]]:
+    """
+    Unique build keys; probe keys drawn uniformly from the build keys.
+    """
+    build = list(range(rows))
+    rng.shuffle(build)
+    probe = [rng.randrange(rows) for _ in range(rows)]
+    return build, probe
+
+
+def _zipf(
+    rng: random.Random, rows: int, exponent: float = 1.1
+) -> Tuple[List[int], List[int]]:
+    """
+    Unique build keys; probe keys follow a Zipf distribution over the build keys, so a
+    few hot keys receive most of the probes.
+    """
+    build = list(range(rows))
+    rng.shuffle(build)
+    cum_weights = list(accumulate(1.0 / (rank**exponent) for rank in range(1, rows + 1)))
+    probe = rng.choices(build, cum_weights=cum_weights, k=rows)
+    return build, probe
+
+
+def _many_to_many(
+    rng: random.Random, rows: int, fanout: int = 10
+) -> Tuple[List[int], List[int]]:
+    """
+    Both sides repeat every key `fanout` times, producing `rows * fanout` output rows.
+    """
+    distinct = max(1, rows // fanout)
+    build = [rng.randrange(distinct) for _ in range(rows)]
+    probe = [rng.randrange(distinct) for _ in range(rows)]
+    return build, probe
+
+
+def _low_selectivity(
+    rng: random.Random, rows: int, match_rate: float = 0.01
+) -> Tuple[List[int], List[int]]:
+    """
+    Unique build keys; only about `match_rate` of the probe keys find a match.
+    """
+    build = list(range(rows))
+    rng.shuffle(build)
+    probe = [
+        rng.randrange(rows) if rng.random() < match_rate else rows + rng.randrange(rows)
+        for _ in range(rows)
+    ]
+    return build, probe
+
+
+DISTRIBUTIONS: Dict[str, Callable[..., Tuple[List[int], List[int]]]] = {
+    "uniform": _uniform,
+    "zipf": _zipf,
+    "many_to_many": _many_to_many,
+    "low_selectivity": _low_selectivity,
+}
+
+
+def generate(
+    distribution: str, rows: int, key_type: str = "int", seed: int = 0
+) -> Tuple[BaseDataset[BuildRow], BaseDataset[ProbeRow]]:
+    """
+    Generate a reproducible pair of datasets with `rows` rows on each side.
+    """
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(
+            f"distribution must be one of {tuple(DISTRIBUTIONS)}, got {distribution!r}"
+        )
+
+    rng = random.Random(f"{seed}:{distribution}:{rows}")
+    build_keys, probe_keys = DISTRIBUTIONS[distribution](rng, rows)
+    build_keys = _encode_keys(build_keys, key_type)
+    probe_keys = _encode_keys(probe_keys, key_type)
+
+    build = [BuildRow(k, f"payload_{i}") for i, k in enumerate(build_keys)]
+    probe = [ProbeRow(k, float(i)) for i, k in enumerate(probe_keys)]
+    return BaseDataset[BuildRow](rows=build), BaseDataset[ProbeRow](rows=probe)
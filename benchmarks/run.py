@@ -0,0 +1,257 @@
+"""
+Benchmark every join algorithm on synthetic data and store the results as JSON.
+
+    python -m benchmarks.run --rows 10000 100000 --output results.json
+    python -m benchmarks.run --rows 10000 --baseline results.json --max-regression 0.1
+
+Each case is identified by (algorithm, distribution, key_type, rows). With --baseline,
+cases whose median time grew by more than --max-regression are reported and the
+process exits with status 1.
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from time import perf_counter
+from typing import Any, Dict, List, Optional
+
+from benchmarks.datagen import (
+    DISTRIBUTIONS,
+    KEY_TYPES,
+    BuildRow,
+    JoinedRow,
+    ProbeRow,
+    generate,
+)
+from join_algorithms.config import JoinConfig
+from join_algorithms.external_sort_merge_join import ExternalSortMergeAlgorithm
+from join_algorithms.grace_hash_join import GraceHashJoinAlgorithm
+from join_algorithms.hash_join import HashJoinAlgorithm
+from join_algorithms.metrics import collecting_callback
+from join_algorithms.parallel_hash_join import ParallelHashJoinAlgorithm
+from join_algorithms.sort_merge_join import SortMergeJoinAlgorithm
+
+
+ALGORITHMS = {
+    "hash": HashJoinAlgorithm,
+    "sort_merge": SortMergeJoinAlgorithm,
+    "parallel_hash": ParallelHashJoinAlgorithm,
+    "grace_hash": GraceHashJoinAlgorithm,
+    "external_sort_merge": ExternalSortMergeAlgorithm,
+}
+
+CASE_KEYS = ("algorithm", "distribution", "key_type", "rows")
+
+
+def _peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_case(
+    algorithm: str,
+    distribution: str,
+    key_type: str,
+    rows: int,
+    repeats: int,
+    seed: int,
+    config: JoinConfig,
+) -> Dict[str, Any]:
+    """
+    Run one benchmark case `repeats` times and summarize it.
+
+    Peak RSS is the process high-water mark, so it is only specific to the case when
+    the case runs in its own process (the default, see --no-isolate).
+    """
+    dataset1, dataset2 = generate(distribution, rows, key_type, seed)
+    callback, collected = collecting_callback()
+    joiner = ALGORITHMS[algorithm][BuildRow, ProbeRow, JoinedRow](
+        config, on_metrics=callback
+    )
+
+    timings = []
+    output_rows = 0
+    for _ in range(repeats):
+        start = perf_counter()
+        output_rows = len(joiner.join(dataset1, dataset2, 0, 0).rows)
+        timings.append(perf_counter() - start)
+
+    median = statistics.median(timings)
+    last = collected[-1]
+    return {
+        "algorithm": algorithm,
+        "distribution": distribution,
+        "key_type": key_type,
+        "rows": rows,
+        "seconds": timings,
+        "median_seconds": median,
+        "throughput_rows_per_s": (len(dataset1.rows) + len(dataset2.rows)) / median
+        if median
+        else None,
+        "output_rows": output_rows,
+        "peak_rss_bytes": _peak_rss_bytes(),
+        "spilled_bytes": last.counters.get("spilled_bytes", 0),
+        "phase_seconds": last.phase_seconds,
+        "counters": last.counters,
+        "worker_skew": last.worker_skew,
+    }
+
+
+def run_benchmarks(
+    algorithms: List[str],
+    distributions: List[str],
+    key_types: List[str],
+    rows: List[int],
+    repeats: int = 3,
+    seed: int = 0,
+    config: Optional[JoinConfig] = None,
+    isolate: bool = True,
+) -> Dict[str, Any]:
+    config = config if config is not None else JoinConfig.from_env()
+    results = []
+    for n in rows:
+        for distribution in distributions:
+            for key_type in key_types:
+                for algorithm in algorithms:
+                    args = (algorithm, distribution, key_type, n, repeats, seed, config)
+                    if isolate:
+                        # a fresh process per case keeps peak RSS and caches separate
+                        with ProcessPoolExecutor(
+                            max_workers=1, mp_context=mp.get_context("spawn")
+                        ) as executor:
+                            result = executor.submit(run_case, *args).result()
+                    else:
+                        result = run_case(*args)
+                    results.append(result)
+                    print(_format_result(result), file=sys.stderr)
+
+    return {
+        "metadata": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": seed,
+            "repeats": repeats,
+            "isolated": isolate,
+            "config": asdict(config),
+        },
+        "results": results,
+    }
+
+
+def _case_id(result: Dict[str, Any]) -> tuple:
+    return tuple(result[k] for k in CASE_KEYS)
+
+
+def _format_result(result: Dict[str, Any]) -> str:
+    throughput = result["throughput_rows_per_s"] or 0.0
+    return (
+        f"{result['algorithm']:<20} {result['distribution']:<16} "
+        f"{result['key_type']:<4} {result['rows']:>10} rows  "
+        f"{result['median_seconds']:>9.4f}s  {throughput:>12.0f} rows/s  "
+        f"rss={result['peak_rss_bytes'] / 2**20:.1f}MiB  "
+        f"spilled={result['spilled_bytes']}B"
+    )
+
+
+def compare(
+    current: Dict[str, Any], baseline: Dict[str, Any], max_regression: float
+) -> List[Dict[str, Any]]:
+    """
+    Return the cases whose median time regressed by more than `max_regression`
+    (a fraction, e.g. 0.1 for 10%) relative to the baseline run.
+    """
+    baseline_by_case = {_case_id(r): r for r in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        previous = baseline_by_case.get(_case_id(result))
+        if previous is None or not previous["median_seconds"]:
+            continue
+        change = result["median_seconds"] / previous["median_seconds"] - 1.0
+        if change > max_regression:
+            regressions.append(
+                {
+                    **{k: result[k] for k in CASE_KEYS},
+                    "baseline_seconds": previous["median_seconds"],
+                    "current_seconds": result["median_seconds"],
+                    "change": change,
+                }
+            )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--algorithms", nargs="+", choices=list(ALGORITHMS), default=list(ALGORITHMS)
+    )
+    parser.add_argument(
+        "--distributions",
+        nargs="+",
+        choices=list(DISTRIBUTIONS),
+        default=list(DISTRIBUTIONS),
+    )
+    parser.add_argument(
+        "--key-types", nargs="+", choices=list(KEY_TYPES), default=["int"]
+    )
+    parser.add_argument("--rows", nargs="+", type=int, default=[10_000, 100_000])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--no-isolate",
+        dest="isolate",
+        action="store_false",
+        help="run every case in this process instead of a fresh one",
+    )
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of a previous run to compare")
+    parser.add_argument("--max-regression", type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    # spill into a private directory unless JOIN_SPILL_DIR points somewhere else
+    with tempfile.TemporaryDirectory(prefix="join_bench_") as spill_dir:
+        config = JoinConfig.from_env(JoinConfig(spill_dir=spill_dir))
+        report = run_benchmarks(
+            args.algorithms,
+            args.distributions,
+            args.key_types,
+            args.rows,
+            repeats=args.repeats,
+            seed=args.seed,
+            config=config,
+            isolate=args.isolate,
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.max_regression)
+        for r in regressions:
+            print(
+                f"REGRESSION {r['algorithm']} {r['distribution']} {r['key_type']} "
+                f"{r['rows']} rows: {r['baseline_seconds']:.4f}s -> "
+                f"{r['current_seconds']:.4f}s ({r['change']:+.1%})",
+                file=sys.stderr,
+            )
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
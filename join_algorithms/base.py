@@ -1,16 +1,32 @@
+import threading
+import weakref
 from abc import ABC, abstractmethod
-from dataclasses import dataclass, astuple
+from contextlib import contextmanager
+from time import perf_counter
+from dataclasses import dataclass, fields, is_dataclass
+from operator import attrgetter
 from typing import (
     Generic,
     TypeVar,
-    Sequence,
+    Iterable,
     get_args,
     ClassVar,
     Any,
+    Callable,
     Dict,
     Protocol,
     get_origin,
     Optional,
+    Tuple,
+    Iterator,
+    Union,
+)
+from join_algorithms.config import JoinConfig, resolve_config
+from join_algorithms.metrics import (
+    NULL_RECORDER,
+    MetricsCallback,
+    MetricsRecorder,
+    _NullRecorder,
 )
 
 
@@ -23,12 +39,83 @@ U = TypeVar("U", bound=DataClassProtocol)
 V = TypeVar("V", bound=DataClassProtocol)
 
 
+class RowLayout:
+    """
+    Precomputed field accessors for a dataclass row type.
+
+    `astuple` recursively deep-copies every field, which dominates the per-row cost of
+    extracting join keys. The layout reads fields directly with `operator.attrgetter`.
+    """
+
+    __slots__ = ("row_type", "field_names", "_values", "_key_getters", "__weakref__")
+
+    def __init__(self, row_type: type) -> None:
+        self.row_type = row_type
+        self.field_names: Tuple[str, ...] = tuple(f.name for f in fields(row_type))
+        if len(self.field_names) == 1:
+            getter = attrgetter(self.field_names[0])
+            self._values: Callable[[Any], tuple] = lambda row: (getter(row),)
+        elif self.field_names:
+            self._values = attrgetter(*self.field_names)
+        else:
+            self._values = lambda row: ()
+        self._key_getters: Dict[int, Callable[[Any], Any]] = {}
+
+    def values(self, row: Any) -> tuple:
+        return self._values(row)
+
+    def key_getter(self, key_idx: int) -> Callable[[Any], Any]:
+        getter = self._key_getters.get(key_idx)
+        if getter is None:
+            getter = attrgetter(self.field_names[key_idx])
+            self._key_getters[key_idx] = getter
+        return getter
+
+
+_ROW_LAYOUTS: "weakref.WeakKeyDictionary[type, RowLayout]" = weakref.WeakKeyDictionary()
+
+
+def row_layout(row_type: type) -> RowLayout:
+    layout = _ROW_LAYOUTS.get(row_type)
+    if layout is None:
+        layout = RowLayout(row_type)
+        _ROW_LAYOUTS[row_type] = layout
+    return layout
+
+
+def row_key(row: Any, key_idx: int) -> Any:
+    """
+    Return the `key_idx`-th field of a dataclass row.
+    """
+    return row_layout(type(row)).key_getter(key_idx)(row)
+
+
+def row_values(row: Any) -> tuple:
+    """
+    Shallow equivalent of `astuple(row)`.
+    """
+    return row_layout(type(row)).values(row)
+
+
+def _concrete_row_type(param: Any) -> Optional[type]:
+    if isinstance(param, type) and is_dataclass(param):
+        return param
+    return None
+
+
+# cls -> {params: parameterized subclass}; both levels are weak so classes that are no
+# longer referenced anywhere else can still be collected.
+_PARAMETERIZED_CLASSES: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+_PARAMETERIZED_LOCK = threading.Lock()
+
+
 @dataclass(frozen=True)
 class BaseDataset(Generic[T]):
-    rows: Sequence[T]
-
-    def __len__(self) -> int:
-        return len(self.rows)
+    # any re-iterable collection of rows, e.g. a list or a lazy file-backed reader
+    # from join_algorithms.file_dataset. Datasets are deliberately not sized: file
+    # readers can only count their rows by scanning them, and list() would do that
+    # just to get a length hint. Use len(dataset.rows) when the rows are a list.
+    rows: Iterable[T]
 
     def __iter__(self):
         return iter(self.rows)
@@ -36,20 +123,65 @@ class BaseDataset(Generic[T]):
 
 class BaseAlgorithm(ABC, Generic[T, U, V]):
     algorithm_name: str
+    # per-class join metadata, filled in by __class_getitem__
+    _row_types: ClassVar[Tuple[Optional[type], ...]] = ()
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        config: Optional[JoinConfig] = None,
+        on_metrics: Optional[MetricsCallback] = None,
+    ) -> None:
         self._result_type: Optional[type] = None
+        self.config = resolve_config(config)
+        self.on_metrics = on_metrics
+        # set on nested joiners so they report into the join that created them
+        self._parent_recorder: Optional[MetricsRecorder] = None
 
     @classmethod
     def __class_getitem__(cls, params):
+        """
+        Return the subclass of `cls` bound to `params`.
+
+        Subclasses are memoized per (class, params), so subscripting on the hot path
+        (e.g. `HashJoinAlgorithm[A, B, C]` for every Grace join) doesn't create a new
+        class each time.
+        """
+        params = params if isinstance(params, tuple) else (params,)
+        with _PARAMETERIZED_LOCK:
+            cache = _PARAMETERIZED_CLASSES.get(cls)
+            if cache is None:
+                cache = weakref.WeakValueDictionary()
+                _PARAMETERIZED_CLASSES[cls] = cache
+            try:
+                parameterized = cache.get(params)
+            except TypeError:
+                # unhashable params can't be cached
+                return cls._parameterize(params)
+            if parameterized is None:
+                parameterized = cls._parameterize(params)
+                cache[params] = parameterized
+            return parameterized
+
+    @classmethod
+    def _parameterize(cls, params: tuple) -> type:
         class ParameterizedAlgorithm(cls):
-            _type_params = params if isinstance(params, tuple) else (params,)
+            _type_params = params
+            _row_types = tuple(_concrete_row_type(p) for p in params)
 
-            def __init__(self) -> None:
-                super().__init__()
+            def __init__(
+                self,
+                config: Optional[JoinConfig] = None,
+                on_metrics: Optional[MetricsCallback] = None,
+                **kwargs: Any,
+            ) -> None:
+                # algorithm-specific options, such as an executor, are passed through
+                super().__init__(config, on_metrics, **kwargs)
                 if len(self._type_params) >= 3:
                     self._result_type = self._type_params[2]
 
+        ParameterizedAlgorithm.__name__ = cls.__name__
+        ParameterizedAlgorithm.__qualname__ = cls.__qualname__
+        ParameterizedAlgorithm.__module__ = cls.__module__
         return ParameterizedAlgorithm
 
     def _extract_result_type(self):
@@ -85,6 +217,7 @@ class BaseAlgorithm(ABC, Generic[T, U, V]):
         dataset2: BaseDataset[U],
         build_key_idx: int,
         probe_key_idx: int,
+        config: Optional[JoinConfig] = None,
     ) -> BaseDataset[V]:
         """
         Perform a join between two datasets on specified key indices.
@@ -94,18 +227,135 @@ class BaseAlgorithm(ABC, Generic[T, U, V]):
             dataset2: The dataset to probe against the hash table.
             build_key_idx: The index of the key in dataset1 to build the hash table on
             probe_key_idx: The index of the key in dataset2 to probe against the hash table
+            config: Overrides the algorithm's configuration for this call only
 
         Returns:
             A new dataset containing the joined rows.
         """
         pass
 
+    def _resolve_config(self, config: Optional[JoinConfig] = None) -> JoinConfig:
+        return resolve_config(config, self.config)
+
+    @contextmanager
+    def _measure(self) -> Iterator[Union[MetricsRecorder, _NullRecorder]]:
+        """
+        Provide the recorder for one join call and deliver its metrics on completion.
+        Without a callback this yields a no-op recorder, so disabled metrics only cost
+        a few calls per join, never per row.
+        """
+        if self._parent_recorder is not None:
+            yield self._parent_recorder
+            return
+        if self.on_metrics is None:
+            yield NULL_RECORDER
+            return
+
+        recorder = MetricsRecorder(self.algorithm_name)
+        start = perf_counter()
+        yield recorder
+        recorder.add_time("total", perf_counter() - start)
+        self.on_metrics(recorder.metrics)
+
+    def _make_joiner(
+        self,
+        algorithm_cls: type,
+        config: Optional[JoinConfig] = None,
+        recorder: Union[MetricsRecorder, _NullRecorder, None] = None,
+    ) -> "BaseAlgorithm":
+        """
+        Create a nested joiner (e.g. the per-partition hash join) that produces the same
+        result type as this algorithm, shares its configuration and reports its metrics
+        into `recorder`.
+        """
+        joiner = self._new_joiner(algorithm_cls, self._resolve_config(config))
+        if isinstance(recorder, MetricsRecorder):
+            joiner._parent_recorder = recorder
+        return joiner
+
+    def _new_joiner(self, algorithm_cls: type, config: JoinConfig) -> "BaseAlgorithm":
+        if hasattr(self, "_type_params") and len(getattr(self, "_type_params")) >= 3:
+            # nested classes are stored on this class so they stay alive (and cached)
+            # for as long as this class is
+            nested_joiners = type(self).__dict__.get("_nested_joiners")
+            if nested_joiners is None:
+                nested_joiners = {}
+                setattr(type(self), "_nested_joiners", nested_joiners)
+            nested = nested_joiners.get(algorithm_cls)
+            if nested is None:
+                params = getattr(self, "_type_params")
+                nested = algorithm_cls[params[0], params[1], params[2]]
+                nested_joiners[algorithm_cls] = nested
+            return nested(config)
+
+        joiner = algorithm_cls(config)
+        joiner._result_type = self._result_type
+        return joiner
+
+    def _key_accessor(self, side: int, key_idx: int) -> Callable[[Any], Any]:
+        """
+        Return a function extracting the join key from rows of input `side` (0 or 1).
+        Uses the precomputed layout when the side's row type is known from the type
+        parameters, and looks the layout up per row otherwise.
+        """
+        row_type = self._row_types[side] if len(self._row_types) > side else None
+        if row_type is not None:
+            return row_layout(row_type).key_getter(key_idx)
+        return lambda row: row_key(row, key_idx)
+
+    def _row_combiner(
+        self, probe_key_idx: Optional[int]
+    ) -> Callable[[Any, Any], tuple]:
+        """
+        Return a function building the combined tuple of a build and a probe row, i.e.
+        the fields of the build row followed by the probe row's fields minus its key.
+        With `probe_key_idx=None` all of the probe row's fields are kept.
+        """
+        build_type = self._row_types[0] if len(self._row_types) > 0 else None
+        probe_type = self._row_types[1] if len(self._row_types) > 1 else None
+        build_values = row_layout(build_type).values if build_type else row_values
+        probe_values = row_layout(probe_type).values if probe_type else row_values
+
+        if probe_key_idx is None:
+            return lambda row1, row2: build_values(row1) + probe_values(row2)
+
+        def combine(row1: Any, row2: Any) -> tuple:
+            row2_tuple = probe_values(row2)
+            return (
+                build_values(row1)
+                + row2_tuple[:probe_key_idx]
+                + row2_tuple[probe_key_idx + 1 :]
+            )
+
+        return combine
+
     def _combine_rows(self, row1: T, row2: U, probe_key_idx: int) -> tuple:
-        row1_tuple = astuple(row1)
-        row2_tuple = astuple(row2)
+        row1_tuple = row_values(row1)
+        row2_tuple = row_values(row2)
         row2_without_key = row2_tuple[:probe_key_idx] + row2_tuple[probe_key_idx + 1 :]
         return row1_tuple + row2_without_key
 
+    def _result_factory(self) -> Callable[[tuple], V]:
+        """
+        Return a function turning a combined tuple into a result object, resolving the
+        result type once instead of on every row.
+        """
+        self._set_result_type()
+        result_type = self._result_type
+
+        if not result_type or isinstance(result_type, TypeVar):
+            return lambda combined_tuple: combined_tuple  # type: ignore
+
+        def create(combined_tuple: tuple) -> V:
+            try:
+                return result_type(*combined_tuple)
+            except TypeError as e:
+                raise TypeError(
+                    f"Error creating result object of type {result_type} with data {combined_tuple}: {e}"
+                ) from e
+
+        return create
+
     def _create_result_object(self, combined_tuple: tuple) -> V:
         self._set_result_type()
 
@@ -1,15 +1,143 @@
 import os
 import multiprocessing as mp
-from dataclasses import dataclass
-from typing import Final
+from dataclasses import dataclass, field, replace
+from typing import Final, Optional, Mapping, Dict, Any
+
+
+CODECS: Final = ("none", "zlib", "bz2", "lzma")
+
+
+def _parse_bool(raw: str) -> bool:
+    value = raw.strip().lower()
+    if value in ("1", "true", "yes", "on"):
+        return True
+    if value in ("0", "false", "no", "off"):
+        return False
+    raise ValueError(f"not a boolean: {raw!r}")
+
+
+# environment variable -> (JoinConfig field, parser)
+ENV_OVERRIDES: Final[Dict[str, tuple]] = {
+    "JOIN_MEMORY_LIMIT_BYTES": ("memory_limit_bytes", int),
+    "JOIN_NUM_PARTITIONS": ("num_partitions", int),
+    "JOIN_NUM_WORKERS": ("num_workers", int),
+    "JOIN_MERGE_PARTITIONS": ("merge_partitions", int),
+    "JOIN_SPILL_DIR": ("spill_dir", str),
+    "JOIN_SPILL_QUOTA_BYTES": ("spill_quota_bytes", int),
+    "JOIN_BATCH_SIZE": ("batch_size", int),
+    "JOIN_CODEC": ("codec", str),
+    "JOIN_ENCODE_KEYS": ("encode_keys", _parse_bool),
+    "JOIN_MAX_ENCODED_KEYS": ("max_encoded_keys", int),
+}
+
+
+def _default_workers() -> int:
+    return max(1, mp.cpu_count() - 1)
 
 
 @dataclass(frozen=True)
 class JoinConfig:
-    EXTERNAL_SORT_MEMORY_LIMIT: Final[int] = 10
-    GRACE_HASH_PARTITIONS: Final[int] = 5
-    PARALLEL_WORKERS: Final[int] = max(1, mp.cpu_count() - 1)
-    TEMP_DIR: Final[str] = os.path.join(os.getcwd(), "temp")
+    """
+    Runtime knobs shared by all join algorithms.
+
+    Attributes:
+        memory_limit_bytes: In-memory budget for a sorted run in the external sort.
+        num_partitions: Number of on-disk partitions used by the Grace hash join.
+        num_workers: Worker threads/processes used by the parallel algorithms. The
+            external sort only uses processes from an executor it is given.
+        merge_partitions: Key ranges the external sort's final merge is split into.
+        spill_dir: Directory under which per-join scratch directories are created.
+            Defaults to `./temp`, resolved against the working directory at join time.
+        spill_quota_bytes: Maximum number of bytes a single join may spill, if set.
+            Batches are checked before they are written, except for runs sorted in
+            the external sort's worker processes, which are checked once written.
+        batch_size: Number of rows serialized together in a spill-file batch.
+        codec: Compression applied to spilled batches, one of `CODECS`.
+        encode_keys: Replace the join keys of both inputs with dense integer codes
+            from a shared dictionary before joining, and decode them in the result.
+            Shrinks the spill files of the out-of-core joins for long keys. Every
+            input and result row is copied, so in-memory joins only get slower.
+        max_encoded_keys: Bound on the distinct keys the encoding dictionary, which
+            lives in memory, may hold. Joins with more keys fall back to plain keys.
+            None means unbounded.
+    """
+
+    memory_limit_bytes: int = 64 * 1024 * 1024
+    num_partitions: int = 5
+    num_workers: int = field(default_factory=_default_workers)
+    merge_partitions: int = 1
+    spill_dir: Optional[str] = None
+    spill_quota_bytes: Optional[int] = None
+    batch_size: int = 1024
+    codec: str = "none"
+    encode_keys: bool = False
+    max_encoded_keys: Optional[int] = 1_000_000
+
+    def __post_init__(self) -> None:
+        for name in (
+            "memory_limit_bytes",
+            "num_partitions",
+            "num_workers",
+            "merge_partitions",
+            "batch_size",
+        ):
+            value = getattr(self, name)
+            if not isinstance(value, int) or value < 1:
+                raise ValueError(f"{name} must be a positive integer, got {value!r}")
+
+        if self.spill_quota_bytes is not None and self.spill_quota_bytes < 0:
+            raise ValueError(
+                f"spill_quota_bytes must be non-negative, got {self.spill_quota_bytes}"
+            )
+        if self.codec not in CODECS:
+            raise ValueError(f"codec must be one of {CODECS}, got {self.codec!r}")
+        if not isinstance(self.encode_keys, bool):
+            raise ValueError(f"encode_keys must be a bool, got {self.encode_keys!r}")
+        if self.max_encoded_keys is not None and self.max_encoded_keys < 1:
+            raise ValueError(
+                f"max_encoded_keys must be positive, got {self.max_encoded_keys}"
+            )
+
+    @property
+    def resolved_spill_dir(self) -> str:
+        if self.spill_dir is not None:
+            return self.spill_dir
+        return os.path.join(os.getcwd(), "temp")
+
+    @classmethod
+    def from_env(
+        cls,
+        base: Optional["JoinConfig"] = None,
+        environ: Optional[Mapping[str, str]] = None,
+    ) -> "JoinConfig":
+        """
+        Return `base` (or the defaults) with any `JOIN_*` environment variables applied.
+        """
+        environ = os.environ if environ is None else environ
+        overrides: Dict[str, Any] = {}
+        for env_name, (field_name, parse) in ENV_OVERRIDES.items():
+            raw = environ.get(env_name)
+            if raw is None or raw == "":
+                continue
+            try:
+                overrides[field_name] = parse(raw)
+            except ValueError as e:
+                raise ValueError(f"Invalid value for {env_name}: {raw!r}") from e
+
+        return replace(base if base is not None else cls(), **overrides)
+
+    def replace(self, **changes: Any) -> "JoinConfig":
+        return replace(self, **changes)
 
 
 DEFAULT_CONFIG: Final[JoinConfig] = JoinConfig()
+
+
+def resolve_config(*configs: Optional[JoinConfig]) -> JoinConfig:
+    """
+    Return the first config given, or the defaults with environment overrides applied.
+    """
+    for config in configs:
+        if config is not None:
+            return config
+    return JoinConfig.from_env()
@@ -1,11 +1,40 @@
-import os
 import heapq
-import pickle
-import uuid
-from typing import TypeVar, Final, List, Iterator, ClassVar, Any, Dict, Protocol
-from dataclasses import astuple
-from join_algorithms.base import BaseAlgorithm, BaseDataset
-from join_algorithms.config import DEFAULT_CONFIG
+import os
+import sys
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import (
+    Executor,
+    Future,
+    ThreadPoolExecutor,
+)
+from typing import (
+    TypeVar,
+    Callable,
+    Iterable,
+    List,
+    Iterator,
+    ClassVar,
+    Any,
+    Dict,
+    Protocol,
+    Tuple,
+    NamedTuple,
+    Optional,
+    Deque,
+)
+from dataclasses import fields
+from itertools import chain, groupby, islice
+from join_algorithms.base import BaseAlgorithm, BaseDataset, row_key
+from join_algorithms.config import JoinConfig
+from join_algorithms.key_encoding import join_encoded
+from join_algorithms.metrics import MetricsCallback
+from join_algorithms.spill import (
+    SpillManager,
+    encode_batch,
+    read_batch,
+    read_batches,
+)
 from join_algorithms.sort_merge_join import SortMergeJoinAlgorithm
 
 
@@ -18,77 +47,417 @@ U = TypeVar("U", bound=DataClassProtocol)
 V = TypeVar("V", bound=DataClassProtocol)
 
 
+# most runs merged at once; more are first merged down in extra passes, so the
+# batches held open while merging stay within the memory limit
+_MERGE_FAN_IN = 16
+
+
+def _estimate_row_bytes(row: Any) -> int:
+    """
+    Shallow estimate of a row's in-memory size: the row object plus its field values.
+    """
+    return sys.getsizeof(row) + sum(
+        sys.getsizeof(getattr(row, f.name)) for f in fields(row)
+    )
+
+
+def _run_batch_rows(config: JoinConfig, row: Any) -> int:
+    """
+    Rows per batch of a sorted run: at most `config.batch_size`, and small enough that
+    one batch of each of `_MERGE_FAN_IN` runs of both inputs fits in the memory limit.
+    """
+    return max(
+        1,
+        min(
+            config.batch_size,
+            config.memory_limit_bytes // (2 * _MERGE_FAN_IN * _estimate_row_bytes(row)),
+        ),
+    )
+
+
+class SortedRun(NamedTuple):
+    """
+    A sorted run on disk and the (offset, first key, last key) of each of its batches,
+    so a key range can be read without decoding the batches outside it. The index is
+    empty for runs that are only ever merged whole.
+    """
+
+    path: str
+    batches: List[Tuple[int, Any, Any]]
+
+
+def _write_run(
+    temp_file: str,
+    rows: Iterable[Any],
+    batch_size: int,
+    codec: str,
+    account: Optional[Callable[[int], None]] = None,
+    key_fn: Optional[Callable[[Any], Any]] = None,
+) -> List[Tuple[int, Any, Any]]:
+    """
+    Write a run in batches. With `account`, each batch's size is reported before the
+    batch is written, so a spill quota is enforced before the bytes reach the disk.
+    With `key_fn`, returns the offset and key bounds of every batch.
+    """
+    batches = []
+    offset = 0
+    rows = iter(rows)
+    with open(temp_file, "wb") as f:
+        while batch := list(islice(rows, batch_size)):
+            data = encode_batch(batch, codec)
+            if account is not None:
+                account(len(data))
+            f.write(data)
+            if key_fn is not None:
+                batches.append((offset, key_fn(batch[0]), key_fn(batch[-1])))
+            offset += len(data)
+    return batches
+
+
+def _read_run(temp_file: str, codec: str) -> Iterator[Any]:
+    with open(temp_file, "rb") as f:
+        yield from read_batches(f, codec)
+
+
+def _sort_and_write_run(
+    rows: list,
+    key_idx: int,
+    temp_file: str,
+    num_samples: int,
+    batch_size: int = 1024,
+    codec: str = "none",
+    account: Optional[Callable[[int], None]] = None,
+) -> Tuple[SortedRun, list]:
+    """
+    Sort a run and write it to disk. Runs in a worker process so the caller can keep
+    reading input while runs are sorted and serialized.
+
+    Returns the run and up to `num_samples` evenly spaced keys from the sorted run,
+    which are used to pick key-range boundaries for a partitioned merge. The batch
+    index is only needed by a partitioned merge too, so it is left empty without
+    samples.
+    """
+    key_fn = lambda r: row_key(r, key_idx)  # noqa: E731
+    rows.sort(key=key_fn)
+    batches = _write_run(
+        temp_file, rows, batch_size, codec, account, key_fn if num_samples else None
+    )
+
+    samples = []
+    if num_samples > 0 and rows:
+        step = max(1, len(rows) // num_samples)
+        samples = [row_key(r, key_idx) for r in rows[::step]]
+    return SortedRun(temp_file, batches), samples
+
+
+def _load_key_range(
+    runs: List[SortedRun], key_idx: int, lower: Any, upper: Any, codec: str = "none"
+) -> List[Any]:
+    """
+    Load the rows with `lower <= key < upper` from every sorted run and merge them.
+    A bound of None means the range is open on that side. Only the batches whose key
+    bounds overlap the range are read and decoded.
+    """
+    key_fn = lambda r: row_key(r, key_idx)  # noqa: E731
+    slices = []
+    for run in runs:
+        rows: List[Any] = []
+        with open(run.path, "rb") as f:
+            for offset, first_key, last_key in run.batches:
+                if lower is not None and last_key < lower:
+                    continue
+                if upper is not None and first_key >= upper:
+                    break
+                f.seek(offset)
+                rows.extend(read_batch(f, codec) or ())
+        lo = 0 if lower is None else bisect_left(rows, lower, key=key_fn)
+        hi = len(rows) if upper is None else bisect_left(rows, upper, key=key_fn)
+        if lo < hi:
+            slices.append(rows[lo:hi])
+    return list(heapq.merge(*slices, key=key_fn))
+
+
+def _merge_join_groups(
+    rows1: Iterable[Any],
+    rows2: Iterable[Any],
+    build_key: Callable[[Any], Any],
+    probe_key: Callable[[Any], Any],
+) -> Iterator[Tuple[List[Any], List[Any]]]:
+    """
+    Merge two key-sorted row streams and yield the (build rows, probe rows) groups of
+    every key present in both. Only the rows of the current key are held in memory;
+    groups without a match are skipped without being collected.
+    """
+    groups1 = groupby(rows1, build_key)
+    groups2 = groupby(rows2, probe_key)
+    group1 = next(groups1, None)
+    group2 = next(groups2, None)
+    while group1 is not None and group2 is not None:
+        if group1[0] < group2[0]:
+            group1 = next(groups1, None)
+        elif group2[0] < group1[0]:
+            group2 = next(groups2, None)
+        else:
+            yield list(group1[1]), list(group2[1])
+            group1 = next(groups1, None)
+            group2 = next(groups2, None)
+
+
+def _merge_join_key_range(
+    runs1: List[SortedRun],
+    runs2: List[SortedRun],
+    build_key_idx: int,
+    probe_key_idx: int,
+    lower: Any,
+    upper: Any,
+    result_type: Optional[type],
+    config: JoinConfig,
+) -> list:
+    """
+    Merge-join a single key range of the sorted runs. Ranges are disjoint, so each one
+    can be joined independently in its own worker process. The caller's resolved
+    `config` is passed in, since a worker must not resolve its own from the environment.
+    """
+    sort_merge_joiner = SortMergeJoinAlgorithm(config)
+    sort_merge_joiner._result_type = result_type
+    return sort_merge_joiner.join(
+        BaseDataset(
+            rows=_load_key_range(runs1, build_key_idx, lower, upper, config.codec)
+        ),
+        BaseDataset(
+            rows=_load_key_range(runs2, probe_key_idx, lower, upper, config.codec)
+        ),
+        build_key_idx,
+        probe_key_idx,
+    ).rows
+
+
 class ExternalSortMergeAlgorithm(BaseAlgorithm[T, U, V]):
-    MEMORY_LIMIT: Final[int] = DEFAULT_CONFIG.EXTERNAL_SORT_MEMORY_LIMIT
-    TMP_DIR: Final[str] = DEFAULT_CONFIG.TEMP_DIR
+    """
+    Sort-merge join whose inputs are sorted in memory-bounded runs spilled to disk.
+
+    Runs are sorted and the key ranges of a partitioned merge are joined in this
+    process unless an `executor` is given. The executor is owned by the caller, which
+    lets many joins share one pool; it should be a process pool created with the
+    "spawn" or "forkserver" context, since joins submit work from reader threads and
+    forking a multi-threaded process is unsafe:
+
+        pool = ProcessPoolExecutor(4, mp_context=multiprocessing.get_context("spawn"))
+        joiner = ExternalSortMergeAlgorithm[A, B, AB](config, executor=pool)
+    """
+
     algorithm_name = "External Sort-Merge Join"
 
-    def __init__(self):
-        super().__init__()
+    def __init__(
+        self,
+        config: Optional[JoinConfig] = None,
+        on_metrics: Optional[MetricsCallback] = None,
+        executor: Optional[Executor] = None,
+    ):
+        super().__init__(config, on_metrics)
         self._result_type = self._extract_result_type()
-        self.temp_files = []
+        self.executor = executor
 
-    def _write_sorted_run(self, rows: list) -> str:
-        temp_file = os.path.join(
-            self.TMP_DIR,
-            f"sorted_run_{len(self.temp_files)}_{uuid.uuid4().hex[:8]}.tmp",
+    def _merge_sorted_runs(
+        self, temp_files: List[str], key_idx: int, codec: str = "none"
+    ) -> Iterator[Any]:
+        return heapq.merge(
+            *(_read_run(f, codec) for f in temp_files),
+            key=lambda r: row_key(r, key_idx),
         )
 
-        with open(temp_file, "wb") as f:
-            pickle.dump(rows, f)
-        return temp_file
+    def _external_sort(
+        self,
+        dataset: BaseDataset,
+        key_idx: int,
+        spill: SpillManager,
+        config: JoinConfig,
+        executor: Optional[Executor] = None,
+    ) -> Tuple[List[SortedRun], list, int]:
+        """
+        Split the dataset into sorted runs that fit in `config.memory_limit_bytes`. The
+        run length in rows is derived from the estimated size of the first row.
 
-    def _read_sorted_run(self, file_path: str) -> Iterator[Any]:
-        with open(file_path, "rb") as f:
-            rows = pickle.load(f)
-            for row in rows:
-                yield row
+        With an executor, each full buffer is handed to a worker which sorts and writes it
+        while this thread keeps reading input. At most 2 * num_workers runs are in flight
+        at once so the buffered rows stay bounded; runs still queued are cancelled if
+        the sort fails.
 
-    def _merge_sorted_runs(self, temp_files: List[str], key_idx: int) -> Iterator[Any]:
-        if not temp_files:
-            return iter([])
+        Returns the runs in creation order, the key samples taken from the runs and the
+        number of rows read.
+        """
+        num_samples = config.merge_partitions if config.merge_partitions > 1 else 0
+        runs: List[SortedRun] = []
+        samples: list = []
+        pending: Deque[Future] = deque()
+        buffer = []
+        rows_per_run = 0
+        rows_read = 0
 
-        iterators = [self._read_sorted_run(f) for f in temp_files]
-        heap = []
+        def flush(rows: list) -> None:
+            temp_file = spill.new_path("sorted_run")
+            if executor is None:
+                run, run_samples = _sort_and_write_run(
+                    rows, key_idx, temp_file, *run_args, account=spill.account
+                )
+                runs.append(run)
+                samples.extend(run_samples)
+                return
 
-        for i, it in enumerate(iterators):
-            try:
-                record = next(it)
-                heapq.heappush(heap, (astuple(record)[key_idx], i, record))
-            except StopIteration:
-                pass
-
-        while heap:
-            _, run_idx, record = heapq.heappop(heap)
-            yield record
-            try:
-                next_record = next(iterators[run_idx])
-                heapq.heappush(
-                    heap, (astuple(next_record)[key_idx], run_idx, next_record)
+            while len(pending) >= 2 * config.num_workers:
+                collect_run(*pending.popleft().result())
+            pending.append(
+                executor.submit(
+                    _sort_and_write_run, rows, key_idx, temp_file, *run_args
                 )
-            except StopIteration:
-                pass
+            )
 
-    def _external_sort(self, dataset: BaseDataset, key_idx: int):
-        temp_files = []
-        buffer = []
+        def collect_run(run: SortedRun, run_samples: list) -> None:
+            # written by a worker process, so only accountable once it is on disk
+            spill.account_file(run.path)
+            runs.append(run)
+            samples.extend(run_samples)
+
+        run_args: tuple = ()
+        try:
+            for row in dataset:
+                if not rows_per_run:
+                    rows_per_run = max(
+                        1, config.memory_limit_bytes // _estimate_row_bytes(row)
+                    )
+                    run_args = (
+                        num_samples,
+                        _run_batch_rows(config, row),
+                        config.codec,
+                    )
+                buffer.append(row)
+
+                if len(buffer) >= rows_per_run:
+                    rows_read += len(buffer)
+                    flush(buffer)
+                    buffer = []
+
+            if buffer:
+                rows_read += len(buffer)
+                flush(buffer)
+
+            while pending:
+                collect_run(*pending.popleft().result())
+        except BaseException:
+            # the executor is the caller's, so only cancel the runs queued here
+            for future in pending:
+                future.cancel()
+            raise
 
-        for row in dataset:
-            buffer.append(row)
+        return runs, samples, rows_read
 
-            if len(buffer) >= self.MEMORY_LIMIT:
-                buffer.sort(key=lambda r: astuple(r)[key_idx])
-                temp_file = self._write_sorted_run(buffer)
-                temp_files.append(temp_file)
-                buffer = []
+    def _merge_runs_down(
+        self,
+        runs: List[SortedRun],
+        key_idx: int,
+        spill: SpillManager,
+        config: JoinConfig,
+    ) -> Tuple[List[SortedRun], int]:
+        """
+        Merge groups of `_MERGE_FAN_IN` runs into longer runs until at most that many
+        are left, so the final merge only holds one batch of each of them at a time.
+        The merged runs are deleted as soon as they have been read. The new runs are
+        only merged whole, so they get no batch index.
 
-        if buffer:
-            buffer.sort(key=lambda r: astuple(r)[key_idx])
-            temp_file = self._write_sorted_run(buffer)
-            temp_files.append(temp_file)
+        Returns the remaining runs and the number of merge passes made.
+        """
+        passes = 0
+        while len(runs) > _MERGE_FAN_IN:
+            passes += 1
+            merged = []
+            for start in range(0, len(runs), _MERGE_FAN_IN):
+                group = runs[start : start + _MERGE_FAN_IN]
+                if len(group) == 1:
+                    merged.append(group[0])
+                    continue
+                rows = self._merge_sorted_runs(
+                    [run.path for run in group], key_idx, config.codec
+                )
+                # runs are never empty, so there always is a first row
+                first = next(rows)
+                temp_file = spill.new_path("sorted_run")
+                batches = _write_run(
+                    temp_file,
+                    chain([first], rows),
+                    _run_batch_rows(config, first),
+                    config.codec,
+                    spill.account,
+                )
+                for run in group:
+                    os.remove(run.path)
+                merged.append(SortedRun(temp_file, batches))
+            runs = merged
+        return runs, passes
 
-        self.temp_files.extend(temp_files)
-        return temp_files
+    def _key_range_boundaries(
+        self, samples: list, num_partitions: int
+    ) -> List[Any]:
+        """
+        Pick up to num_partitions - 1 distinct split keys from the sampled keys so the
+        key ranges hold roughly equal numbers of rows.
+        """
+        if num_partitions <= 1 or not samples:
+            return []
+
+        samples = sorted(samples)
+        boundaries: List[Any] = []
+        for p in range(1, num_partitions):
+            candidate = samples[p * len(samples) // num_partitions]
+            if candidate <= samples[0]:
+                continue
+            if not boundaries or candidate > boundaries[-1]:
+                boundaries.append(candidate)
+        return boundaries
+
+    def _partitioned_merge_join(
+        self,
+        runs1: List[SortedRun],
+        runs2: List[SortedRun],
+        build_key_idx: int,
+        probe_key_idx: int,
+        boundaries: List[Any],
+        config: JoinConfig,
+        executor: Optional[Executor] = None,
+    ) -> list:
+        """
+        Merge-join each key range between consecutive boundaries independently,
+        in parallel when an executor is available. Ranges are emitted in key order.
+        """
+        bounds = [None, *boundaries, None]
+        args = [
+            (
+                runs1,
+                runs2,
+                build_key_idx,
+                probe_key_idx,
+                bounds[p],
+                bounds[p + 1],
+                self._result_type,
+                config,
+            )
+            for p in range(len(bounds) - 1)
+        ]
+
+        if executor is None:
+            partials = [_merge_join_key_range(*a) for a in args]
+        else:
+            futures = [executor.submit(_merge_join_key_range, *a) for a in args]
+            try:
+                partials = [future.result() for future in futures]
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+        joined_rows = []
+        for partial in partials:
+            joined_rows.extend(partial)
+        return joined_rows
 
     def join(
         self,
@@ -96,38 +465,109 @@ class ExternalSortMergeAlgorithm(BaseAlgorithm[T, U, V]):
         dataset2: BaseDataset[U],
         build_key_idx: int,
         probe_key_idx: int,
+        config: Optional[JoinConfig] = None,
     ) -> BaseDataset[V]:
-        if hasattr(self, "_type_params") and len(getattr(self, "_type_params")) >= 3:
-            params = getattr(self, "_type_params")
-            sort_merge_joiner_class = SortMergeJoinAlgorithm[
-                params[0], params[1], params[2]
-            ]
-            sort_merge_joiner = sort_merge_joiner_class()
-        else:
-            sort_merge_joiner = SortMergeJoinAlgorithm()
-            sort_merge_joiner._result_type = self._result_type
-        try:
-            temp_files1 = self._external_sort(dataset1, build_key_idx)
-            temp_files2 = self._external_sort(dataset2, probe_key_idx)
-            sorted_dataset1 = self._merge_sorted_runs(temp_files1, build_key_idx)
-            sorted_dataset2 = self._merge_sorted_runs(temp_files2, probe_key_idx)
-
-            # ideally we'd use iterators throughout, but the sort-merge join implementation
-            # expects BaseDataset inputs, so we convert the iterators to lists here.
-            return sort_merge_joiner.join(
-                BaseDataset[T](rows=list(sorted_dataset1)),  # type: ignore
-                BaseDataset[U](rows=list(sorted_dataset2)),  # type: ignore
-                build_key_idx,
-                probe_key_idx,
+        config = self._resolve_config(config)
+        if config.encode_keys:
+            return join_encoded(
+                self, dataset1, dataset2, build_key_idx, probe_key_idx, config
+            )
+
+        with self._measure() as metrics:
+            spill = SpillManager(
+                base_dir=config.resolved_spill_dir,
+                quota_bytes=config.spill_quota_bytes,
             )
-        finally:
-            for f in self.temp_files:
-                try:
-                    if os.path.exists(f):
-                        os.remove(f)
-                except Exception as e:
-                    print(f"Error cleaning up file {f}: {e}")
-            self.temp_files = []
+            executor = self.executor
+            try:
+                with metrics.phase("sort"):
+                    if executor is None:
+                        runs1, samples1, rows1 = self._external_sort(
+                            dataset1, build_key_idx, spill, config
+                        )
+                        runs2, samples2, rows2 = self._external_sort(
+                            dataset2, probe_key_idx, spill, config
+                        )
+                    else:
+                        # both inputs are read concurrently; sorting happens in the pool
+                        with ThreadPoolExecutor(max_workers=2) as readers:
+                            sort1 = readers.submit(
+                                self._external_sort,
+                                dataset1,
+                                build_key_idx,
+                                spill,
+                                config,
+                                executor,
+                            )
+                            sort2 = readers.submit(
+                                self._external_sort,
+                                dataset2,
+                                probe_key_idx,
+                                spill,
+                                config,
+                                executor,
+                            )
+                            runs1, samples1, rows1 = sort1.result()
+                            runs2, samples2, rows2 = sort2.result()
+
+                metrics.incr("sorted_runs", len(runs1) + len(runs2))
+
+                if config.merge_partitions > 1:
+                    boundaries = self._key_range_boundaries(
+                        samples1 + samples2, config.merge_partitions
+                    )
+                    with metrics.phase("merge"):
+                        joined_rows = self._partitioned_merge_join(
+                            runs1,
+                            runs2,
+                            build_key_idx,
+                            probe_key_idx,
+                            boundaries,
+                            config,
+                            executor,
+                        )
+                    metrics.incr("build_rows", rows1)
+                    metrics.incr("probe_rows", rows2)
+                    metrics.incr("output_rows", len(joined_rows))
+                    metrics.incr("merge_partitions", len(boundaries) + 1)
+                    return BaseDataset[V](rows=joined_rows)
+
+                # stream both merged inputs; only one key's rows are buffered
+                combine_rows = self._row_combiner(probe_key_idx)
+                create_result = self._result_factory()
+                joined_rows = []
+                with metrics.phase("merge"):
+                    runs1, passes1 = self._merge_runs_down(
+                        runs1, build_key_idx, spill, config
+                    )
+                    runs2, passes2 = self._merge_runs_down(
+                        runs2, probe_key_idx, spill, config
+                    )
+                    metrics.incr("merge_passes", passes1 + passes2)
+                    for group1, group2 in _merge_join_groups(
+                        self._merge_sorted_runs(
+                            [run.path for run in runs1], build_key_idx, config.codec
+                        ),
+                        self._merge_sorted_runs(
+                            [run.path for run in runs2], probe_key_idx, config.codec
+                        ),
+                        self._key_accessor(0, build_key_idx),
+                        self._key_accessor(1, probe_key_idx),
+                    ):
+                        for row1 in group1:
+                            for row2 in group2:
+                                joined_rows.append(
+                                    create_result(combine_rows(row1, row2))
+                                )
+
+                metrics.incr("build_rows", rows1)
+                metrics.incr("probe_rows", rows2)
+                metrics.incr("output_rows", len(joined_rows))
+                return BaseDataset[V](rows=joined_rows)
+            finally:
+                metrics.incr("spilled_bytes", spill.spilled_bytes)
+                metrics.incr("spill_files", spill.num_files)
+                spill.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,382 @@
+import csv
+import json
+import mmap
+import re
+import struct
+from abc import abstractmethod
+from dataclasses import fields
+from itertools import islice
+from typing import (
+    IO,
+    Any,
+    Callable,
+    ClassVar,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Protocol,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+    get_type_hints,
+    overload,
+)
+from join_algorithms.base import row_values
+from join_algorithms.config import DEFAULT_CONFIG
+
+
+class DataClassProtocol(Protocol):
+    __dataclass_fields__: ClassVar[Dict[str, Any]]
+
+
+T = TypeVar("T", bound=DataClassProtocol)
+
+# one struct code per field, with an optional repeat count (e.g. "16s" or "4x")
+_FORMAT_CODE = re.compile(r"(\d*)([xcbB?hHiIlLqQnNefdspP])")
+
+
+def _split_format(fmt: str) -> Tuple[str, List[str]]:
+    """
+    Split a struct format into its byte-order prefix and one code per field, dropping
+    pad bytes. Fails on anything `struct` itself would reject.
+    """
+    struct.calcsize(fmt)
+    prefix = fmt[0] if fmt and fmt[0] in "@=<>!" else ""
+    codes = []
+    for count, code in _FORMAT_CODE.findall(fmt[len(prefix) :].replace(" ", "")):
+        if code == "x":
+            continue
+        if code in "sp":
+            codes.append(count + code)
+        else:
+            codes.extend([code] * int(count or 1))
+    return prefix, codes
+
+
+class FixedWidthRows(Sequence[T]):
+    """
+    Read-only sequence of dataclass rows stored as fixed-width binary records.
+
+    The file is memory-mapped, so nothing is read until rows are accessed, and rows
+    are only materialized a batch at a time while iterating. Each record is laid out
+    by the struct format `fmt`, with one code per dataclass field in declaration
+    order; `s` fields are decoded to `str` (minus trailing NULs) unless the field is
+    annotated as `bytes`. Files are written with `write_fixed_width`.
+
+    Usage:
+        rows = FixedWidthRows("sales.bin", Sale, "<qq16sd")
+        sales = BaseDataset[Sale](rows=rows)
+        keys = rows.keys(1)  # unpacked straight from the mapping, no row objects
+    """
+
+    def __init__(
+        self,
+        path: str,
+        row_type: type,
+        fmt: str,
+        batch_size: int = DEFAULT_CONFIG.batch_size,
+        encoding: str = "utf-8",
+    ) -> None:
+        prefix, codes = _split_format(fmt)
+        row_fields = fields(row_type)
+        if len(codes) != len(row_fields):
+            raise ValueError(
+                f"Format {fmt!r} has {len(codes)} fields but {row_type.__name__} "
+                f"has {len(row_fields)}"
+            )
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be positive, got {batch_size}")
+
+        self.path = path
+        self.row_type = row_type
+        self.fmt = fmt
+        self.batch_size = batch_size
+        self.encoding = encoding
+        self._struct = struct.Struct(fmt)
+        self.record_size = self._struct.size
+
+        # per-field (offset, unpacker) pairs for reading single columns in place
+        hints = get_type_hints(row_type)
+        self._columns: List[Tuple[int, struct.Struct]] = []
+        self._text_fields: List[int] = []
+        layout = prefix
+        for i, (f, code) in enumerate(zip(row_fields, codes)):
+            column = struct.Struct(prefix + code)
+            layout += code
+            self._columns.append((struct.calcsize(layout) - column.size, column))
+            if code.endswith("s") and hints.get(f.name) is not bytes:
+                self._text_fields.append(i)
+
+        self._file = open(path, "rb")
+        size = self._file.seek(0, 2)
+        if size % self.record_size:
+            self._file.close()
+            raise ValueError(
+                f"{path} is {size} bytes, not a multiple of the "
+                f"{self.record_size}-byte record size"
+            )
+        self._length = size // self.record_size
+        # an empty file cannot be mapped, and has nothing to read anyway
+        self._mmap: Optional[mmap.mmap] = (
+            mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if size
+            else None
+        )
+
+    def __reduce__(self):
+        # the mapping cannot be pickled, so worker processes reopen the file
+        return (
+            type(self),
+            (self.path, self.row_type, self.fmt, self.batch_size, self.encoding),
+        )
+
+    def _decode(self, values: tuple) -> Any:
+        if self._text_fields:
+            values_list = list(values)
+            for i in self._text_fields:
+                values_list[i] = values_list[i].rstrip(b"\0").decode(self.encoding)
+            values = tuple(values_list)
+        return self.row_type(*values)
+
+    def __len__(self) -> int:
+        return self._length
+
+    @overload
+    def __getitem__(self, index: int) -> T: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[T]: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[T, List[T]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError(f"row index {index} out of range")
+        return self._decode(
+            self._struct.unpack_from(self._mmap, index * self.record_size)
+        )
+
+    def __iter__(self) -> Iterator[T]:
+        for start in range(0, self._length, self.batch_size):
+            stop = min(start + self.batch_size, self._length)
+            # the view must be released before yielding, or close() could not unmap
+            with memoryview(self._mmap) as view:
+                records = view[start * self.record_size : stop * self.record_size]
+                batch = [self._decode(v) for v in self._struct.iter_unpack(records)]
+                records.release()
+            yield from batch
+
+    def key_at(self, index: int, key_idx: int) -> Any:
+        """
+        Return one field of one record, unpacked directly from the mapping.
+        """
+        offset, column = self._columns[key_idx]
+        (value,) = column.unpack_from(self._mmap, index * self.record_size + offset)
+        if key_idx in self._text_fields:
+            return value.rstrip(b"\0").decode(self.encoding)
+        return value
+
+    def keys(self, key_idx: int) -> Iterator[Any]:
+        """
+        Yield the `key_idx`-th field of every record without building the rows.
+        """
+        for index in range(self._length):
+            yield self.key_at(index, key_idx)
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self) -> "FixedWidthRows[T]":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def write_fixed_width(
+    path: str, rows: Iterable[Any], fmt: str, encoding: str = "utf-8"
+) -> int:
+    """
+    Write dataclass rows as fixed-width records readable by `FixedWidthRows`. `str`
+    fields are encoded, then truncated or NUL-padded by struct to their `s` width.
+    Returns the number of rows written.
+    """
+    record = struct.Struct(fmt)
+    count = 0
+    with open(path, "wb") as f:
+        for row in rows:
+            f.write(
+                record.pack(
+                    *(
+                        v.encode(encoding) if isinstance(v, str) else v
+                        for v in row_values(row)
+                    )
+                )
+            )
+            count += 1
+    return count
+
+
+class _LineRows(Iterable[T]):
+    """
+    Rows parsed lazily from a text file, `batch_size` records at a time. Every
+    iteration opens its own handle, so the same rows can be scanned concurrently.
+    The rows are not sized, so algorithms count them as they read them.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        row_type: type,
+        batch_size: int = DEFAULT_CONFIG.batch_size,
+        encoding: str = "utf-8",
+    ) -> None:
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be positive, got {batch_size}")
+        self.path = path
+        self.row_type = row_type
+        self.batch_size = batch_size
+        self.encoding = encoding
+        self._field_names = [f.name for f in fields(row_type)]
+        self._length: Optional[int] = None
+
+    @abstractmethod
+    def _records(self, f: IO[str]) -> Iterator[Any]:
+        """
+        Yield the raw parsed records of the file, one per row.
+        """
+
+    @abstractmethod
+    def _to_row(self, record: Any) -> T:
+        pass
+
+    def __iter__(self) -> Iterator[T]:
+        rows = 0
+        with open(self.path, newline="", encoding=self.encoding) as f:
+            records = self._records(f)
+            while True:
+                batch = [self._to_row(r) for r in islice(records, self.batch_size)]
+                if not batch:
+                    break
+                rows += len(batch)
+                yield from batch
+        self._length = rows
+
+    def count(self) -> int:
+        """
+        Return the number of rows. This takes a full scan of the file unless the rows
+        have already been iterated once, so it is deliberately not `__len__`, which
+        `list()` and `sorted()` would call as a length hint.
+        """
+        if self._length is None:
+            with open(self.path, newline="", encoding=self.encoding) as f:
+                self._length = sum(1 for _ in self._records(f))
+        return self._length
+
+
+def _field_parser(field_type: Any) -> Callable[[str], Any]:
+    if field_type is bool:
+        return lambda value: value.strip().lower() in ("1", "true", "yes")
+    if field_type in (int, float):
+        return field_type
+    return lambda value: value
+
+
+class CsvRows(_LineRows[T]):
+    """
+    Dataclass rows read lazily from a CSV file. Columns map to the dataclass fields in
+    declaration order, and `int`, `float` and `bool` fields are converted from text.
+
+    Usage:
+        sales = BaseDataset[Sale](rows=CsvRows("sales.csv", Sale))
+    """
+
+    def __init__(
+        self,
+        path: str,
+        row_type: type,
+        batch_size: int = DEFAULT_CONFIG.batch_size,
+        header: bool = True,
+        delimiter: str = ",",
+        encoding: str = "utf-8",
+    ) -> None:
+        super().__init__(path, row_type, batch_size, encoding)
+        self.header = header
+        self.delimiter = delimiter
+        hints = get_type_hints(row_type)
+        self._parsers = [_field_parser(hints.get(name)) for name in self._field_names]
+
+    def _records(self, f: IO[str]) -> Iterator[List[str]]:
+        reader = csv.reader(f, delimiter=self.delimiter)
+        if self.header:
+            next(reader, None)
+        return (record for record in reader if record)
+
+    def _to_row(self, record: List[str]) -> T:
+        return self.row_type(*(p(v) for p, v in zip(self._parsers, record)))
+
+
+class JsonLinesRows(_LineRows[T]):
+    """
+    Dataclass rows read lazily from a JSON-lines file, one JSON object (keyed by field
+    name) or array (in field order) per line.
+
+    Usage:
+        sales = BaseDataset[Sale](rows=JsonLinesRows("sales.jsonl", Sale))
+    """
+
+    def _records(self, f: IO[str]) -> Iterator[Any]:
+        return (json.loads(line) for line in f if line.strip())
+
+    def _to_row(self, record: Any) -> T:
+        if isinstance(record, dict):
+            return self.row_type(**record)
+        return self.row_type(*record)
+
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+    from dataclasses import dataclass
+    from join_algorithms.base import BaseDataset
+    from join_algorithms.grace_hash_join import GraceHashJoinAlgorithm
+
+    @dataclass(slots=True, frozen=True)
+    class A:
+        id: int
+        name: str
+
+    @dataclass(slots=True, frozen=True)
+    class B:
+        id: int
+        value: float
+
+    @dataclass(slots=True, frozen=True)
+    class AB:
+        id: int
+        name: str
+        value: float
+
+    with tempfile.TemporaryDirectory() as scratch:
+        a_path = os.path.join(scratch, "a.bin")
+        b_path = os.path.join(scratch, "b.csv")
+        write_fixed_width(a_path, (A(i, f"name_{i}") for i in range(1000)), "<q16s")
+        with open(b_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["id", "value"])
+            writer.writerows((i, i * 1.5) for i in range(500, 600))
+
+        with FixedWidthRows(a_path, A, "<q16s") as a_rows:
+            dataset1 = BaseDataset[A](rows=a_rows)
+            dataset2 = BaseDataset[B](rows=CsvRows(b_path, B))
+            config = DEFAULT_CONFIG.replace(spill_dir=scratch)
+            grace_hash_join = GraceHashJoinAlgorithm[A, B, AB](config)
+            result = grace_hash_join.join(dataset1, dataset2, 0, 0)
+            print(f"Joined {len(result.rows)} rows from disk-backed inputs.")
@@ -1,9 +1,22 @@
-import os
-from typing import TypeVar, Final, Hashable, ClassVar, Any, Dict, Protocol
-from dataclasses import astuple
+from typing import (
+    TypeVar,
+    Hashable,
+    ClassVar,
+    Any,
+    Dict,
+    Protocol,
+    Optional,
+    BinaryIO,
+    Iterator,
+    List,
+    Callable,
+)
 from join_algorithms.base import BaseAlgorithm, BaseDataset
 from join_algorithms.hash_join import HashJoinAlgorithm
-from join_algorithms.config import DEFAULT_CONFIG
+from join_algorithms.config import JoinConfig
+from join_algorithms.key_encoding import join_encoded
+from join_algorithms.metrics import MetricsCallback
+from join_algorithms.spill import SpillManager, read_batches
 
 
 class DataClassProtocol(Protocol):
@@ -16,45 +29,68 @@ V = TypeVar("V", bound=DataClassProtocol)
 
 
 class GraceHashJoinAlgorithm(BaseAlgorithm[T, U, V]):
-    NUM_PARTITIONS: Final[int] = DEFAULT_CONFIG.GRACE_HASH_PARTITIONS
-    TMP_DIR: Final[str] = DEFAULT_CONFIG.TEMP_DIR
     algorithm_name = "Grace Hash Join"
 
-    def __init__(self):
-        super().__init__()
-        os.makedirs(self.TMP_DIR, exist_ok=True)
+    def __init__(
+        self,
+        config: Optional[JoinConfig] = None,
+        on_metrics: Optional[MetricsCallback] = None,
+    ):
+        super().__init__(config, on_metrics)
 
-    def _hash_function(self, key: Hashable) -> int:
-        return hash(key) % self.NUM_PARTITIONS
+    def _hash_function(self, key: Hashable, num_partitions: int) -> int:
+        return hash(key) % num_partitions
 
-    def _partition_datasets(
+    def _read_partition(self, f: BinaryIO, codec: str = "none") -> Iterator[Any]:
+        f.seek(0)
+        return read_batches(f, codec)
+
+    def _partition_dataset(
         self,
-        dataset1: BaseDataset[T],
-        dataset2: BaseDataset[U],
-        build_key_idx: int,
-        probe_key_idx: int,
-    ):
-        partition_files1 = [
-            open(os.path.join(self.TMP_DIR, f"partition1_{i}.tmp"), "w+")
-            for i in range(self.NUM_PARTITIONS)
-        ]
-        partition_files2 = [
-            open(os.path.join(self.TMP_DIR, f"partition2_{i}.tmp"), "w+")
-            for i in range(self.NUM_PARTITIONS)
+        dataset: BaseDataset,
+        key_of: Callable[[Any], Any],
+        name: str,
+        spill: SpillManager,
+        config: JoinConfig,
+    ) -> List[BinaryIO]:
+        # file names only need to be unique within this join's own spill directory
+        partition_files = [
+            spill.open(f"{name}_{i}.tmp", "wb+") for i in range(config.num_partitions)
         ]
+        buffers: List[list] = [[] for _ in range(config.num_partitions)]
 
-        for row in dataset1:
-            key = astuple(row)[build_key_idx]
-            part_key = self._hash_function(key)
+        for row in dataset:
+            key = key_of(row)
+            part_key = self._hash_function(key, config.num_partitions)
 
-            partition_files1[part_key].write(f"{str(row)}\n")
+            buffers[part_key].append(row)
+            if len(buffers[part_key]) >= config.batch_size:
+                spill.write_batch(
+                    partition_files[part_key], buffers[part_key], config.codec
+                )
+                buffers[part_key] = []
 
-        for row in dataset2:
-            key = astuple(row)[probe_key_idx]
-            part_key = self._hash_function(key)
+        for part_key, buffer in enumerate(buffers):
+            if buffer:
+                spill.write_batch(partition_files[part_key], buffer, config.codec)
 
-            partition_files2[part_key].write(f"{str(row)}\n")
+        return partition_files
 
+    def _partition_datasets(
+        self,
+        dataset1: BaseDataset[T],
+        dataset2: BaseDataset[U],
+        build_key_idx: int,
+        probe_key_idx: int,
+        spill: SpillManager,
+        config: JoinConfig,
+    ):
+        partition_files1 = self._partition_dataset(
+            dataset1, self._key_accessor(0, build_key_idx), "partition1", spill, config
+        )
+        partition_files2 = self._partition_dataset(
+            dataset2, self._key_accessor(1, probe_key_idx), "partition2", spill, config
+        )
         return partition_files1, partition_files2
 
     def join(
@@ -63,31 +99,35 @@ class GraceHashJoinAlgorithm(BaseAlgorithm[T, U, V]):
         dataset2: BaseDataset[U],
         build_key_idx: int,
         probe_key_idx: int,
+        config: Optional[JoinConfig] = None,
     ) -> BaseDataset[V]:
-        partition_files1 = []
-        partition_files2 = []
-        if hasattr(self, "_type_params") and len(getattr(self, "_type_params")) >= 3:
-            params = getattr(self, "_type_params")
-            hash_joiner_class = HashJoinAlgorithm[params[0], params[1], params[2]]
-            hash_joiner = hash_joiner_class()
-        else:
-            hash_joiner = HashJoinAlgorithm()
-            hash_joiner._result_type = self._result_type
-
-        try:
-            partition_files1, partition_files2 = self._partition_datasets(
-                dataset1, dataset2, build_key_idx, probe_key_idx
+        config = self._resolve_config(config)
+        if config.encode_keys:
+            return join_encoded(
+                self, dataset1, dataset2, build_key_idx, probe_key_idx, config
             )
 
-            joined_rows = []
+        with self._measure() as metrics, SpillManager(
+            base_dir=config.resolved_spill_dir, quota_bytes=config.spill_quota_bytes
+        ) as spill:
+            hash_joiner = self._make_joiner(HashJoinAlgorithm, config, metrics)
+            with metrics.phase("partition"):
+                partition_files1, partition_files2 = self._partition_datasets(
+                    dataset1, dataset2, build_key_idx, probe_key_idx, spill, config
+                )
+            metrics.incr("spilled_bytes", spill.spilled_bytes)
+            metrics.incr("spill_files", spill.num_files)
 
-            for i in range(self.NUM_PARTITIONS):
-                partition_files1[i].seek(0)
-                partition_files2[i].seek(0)
+            joined_rows = []
 
-                # dangerous; only for demo purposes
-                build_side = [eval(row.strip()) for row in partition_files1[i]]
-                probe_side = [eval(row.strip()) for row in partition_files2[i]]
+            for i in range(config.num_partitions):
+                with metrics.phase("spill_read"):
+                    build_side = list(
+                        self._read_partition(partition_files1[i], config.codec)
+                    )
+                    probe_side = list(
+                        self._read_partition(partition_files2[i], config.codec)
+                    )
 
                 partial_joined = hash_joiner.join(
                     BaseDataset[T](rows=build_side),
@@ -98,14 +138,6 @@ class GraceHashJoinAlgorithm(BaseAlgorithm[T, U, V]):
                 joined_rows.extend(partial_joined)
             return BaseDataset[V](rows=joined_rows)
 
-        finally:
-            for f in partition_files1 + partition_files2:
-                try:
-                    f.close()
-                    os.remove(f.name)
-                except Exception as e:
-                    print(f"Error cleaning up file {f.name}: {e}")
-
 
 if __name__ == "__main__":
     from dataclasses import dataclass
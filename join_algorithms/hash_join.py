@@ -1,7 +1,12 @@
-from typing import TypeVar, ClassVar, Any, Dict, Protocol
+import logging
+from typing import TypeVar, ClassVar, Any, Dict, Protocol, Optional
 from collections import defaultdict
-from dataclasses import astuple
 from join_algorithms.base import BaseAlgorithm, BaseDataset
+from join_algorithms.config import JoinConfig
+from join_algorithms.key_encoding import join_encoded
+from join_algorithms.metrics import MetricsCallback
+
+logger = logging.getLogger(__name__)
 
 
 class DataClassProtocol(Protocol):
@@ -16,12 +21,18 @@ V = TypeVar("V", bound=DataClassProtocol)
 class HashJoinAlgorithm(BaseAlgorithm[T, U, V]):
     algorithm_name = "Hash Join"
 
-    def __init__(self):
-        super().__init__()
+    def __init__(
+        self,
+        config: Optional[JoinConfig] = None,
+        on_metrics: Optional[MetricsCallback] = None,
+    ):
+        super().__init__(config, on_metrics)
         self.hash_table = defaultdict(list)
         self._result_type = self._extract_result_type()
-        print(
-            f"Initialized {self.algorithm_name} with result type: {self._result_type}"
+        logger.debug(
+            "Initialized %s with result type: %s",
+            self.algorithm_name,
+            self._result_type,
         )
 
     def join(
@@ -30,22 +41,45 @@ class HashJoinAlgorithm(BaseAlgorithm[T, U, V]):
         dataset2: BaseDataset[U],
         build_key_idx: int,
         probe_key_idx: int,
+        config: Optional[JoinConfig] = None,
     ) -> BaseDataset[V]:
+        config = self._resolve_config(config)
+        if config.encode_keys:
+            return join_encoded(
+                self, dataset1, dataset2, build_key_idx, probe_key_idx, config
+            )
+
         self.hash_table.clear()
-        # build phase
-        for row in dataset1:
-            key = astuple(row)[build_key_idx]
-            self.hash_table[key].append(row)
-
-        # probe phase
-        joined_rows = []
-        for row in dataset2:
-            key = astuple(row)[probe_key_idx]
-            if key in self.hash_table:
-                for match_row in self.hash_table[key]:
-                    combined_tuple = self._combine_rows(match_row, row, probe_key_idx)
-                    result_obj = self._create_result_object(combined_tuple)
-                    joined_rows.append(result_obj)
+        build_key = self._key_accessor(0, build_key_idx)
+        probe_key = self._key_accessor(1, probe_key_idx)
+        combine_rows = self._row_combiner(probe_key_idx)
+        create_result = self._result_factory()
+
+        with self._measure() as metrics:
+            # build phase
+            build_rows = 0
+            with metrics.phase("build"):
+                for build_rows, row in enumerate(dataset1, 1):
+                    key = build_key(row)
+                    self.hash_table[key].append(row)
+
+            # probe phase
+            joined_rows = []
+            probe_rows = 0
+            with metrics.phase("probe"):
+                for probe_rows, row in enumerate(dataset2, 1):
+                    key = probe_key(row)
+                    if key in self.hash_table:
+                        for match_row in self.hash_table[key]:
+                            combined_tuple = combine_rows(match_row, row)
+                            result_obj = create_result(combined_tuple)
+                            joined_rows.append(result_obj)
+
+            metrics.incr("build_rows", build_rows)
+            metrics.incr("probe_rows", probe_rows)
+            metrics.incr("output_rows", len(joined_rows))
+            metrics.incr("hash_table_keys", len(self.hash_table))
+            metrics.maximum("max_hash_table_keys", len(self.hash_table))
 
         return BaseDataset[V](rows=joined_rows)
 
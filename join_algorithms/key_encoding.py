@@ -0,0 +1,203 @@
+import logging
+import threading
+from typing import (
+    Any,
+    ClassVar,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Protocol,
+    TypeVar,
+)
+from join_algorithms.base import BaseDataset, row_layout
+from join_algorithms.config import JoinConfig
+
+logger = logging.getLogger(__name__)
+
+
+class DataClassProtocol(Protocol):
+    __dataclass_fields__: ClassVar[Dict[str, Any]]
+
+
+T = TypeVar("T", bound=DataClassProtocol)
+
+
+class KeyDictionaryFullError(RuntimeError):
+    pass
+
+
+class KeyDictionary:
+    """
+    Maps join keys to dense integer codes 0, 1, 2, ... in order of first appearance.
+
+    Both inputs of a join are encoded through the same dictionary, so equal keys get
+    equal codes and the join itself only hashes and compares small integers. A
+    dictionary can be shared by several joins to keep codes stable between them.
+    Thread-safe; lookups of known keys do not take the lock.
+
+    Every distinct key is kept in memory. With `max_keys`, encoding a key beyond that
+    many distinct keys raises `KeyDictionaryFullError`.
+    """
+
+    def __init__(self, max_keys: Optional[int] = None) -> None:
+        if max_keys is not None and max_keys < 1:
+            raise ValueError(f"max_keys must be positive, got {max_keys}")
+        self.max_keys = max_keys
+        self._codes: Dict[Any, int] = {}
+        self._keys: List[Any] = []
+        self._lock = threading.Lock()
+
+    def encode(self, key: Any) -> int:
+        code = self._codes.get(key)
+        if code is None:
+            with self._lock:
+                code = self._codes.get(key)
+                if code is None:
+                    code = len(self._keys)
+                    if self.max_keys is not None and code >= self.max_keys:
+                        raise KeyDictionaryFullError(
+                            f"More than {self.max_keys} distinct keys to encode"
+                        )
+                    # publish the key before the code so decode never misses it
+                    self._keys.append(key)
+                    self._codes[key] = code
+        return code
+
+    def decode(self, code: int) -> Any:
+        return self._keys[code]
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._codes
+
+
+def _replace_fields(row: Any, replacements: Mapping[int, Any]) -> Any:
+    """
+    Return a copy of `row` with the fields at the given indexes replaced. Dataclass
+    rows are copied field by field without calling `__init__`, so `__post_init__`
+    validation and `init=False` fields are left alone; tuple rows are rebuilt.
+    """
+    if isinstance(row, tuple):
+        values = list(row)
+        for idx, value in replacements.items():
+            values[idx] = value
+        return tuple(values)
+
+    layout = row_layout(type(row))
+    clone = object.__new__(type(row))
+    for idx, (name, value) in enumerate(zip(layout.field_names, layout.values(row))):
+        object.__setattr__(clone, name, replacements.get(idx, value))
+    return clone
+
+
+class EncodedRows(Iterable[T]):
+    """
+    Lazy view of `rows` with the fields at the indexes in `columns` replaced by their
+    codes in the corresponding dictionary. Rows are encoded while they are iterated,
+    so file-backed inputs stay on disk.
+    """
+
+    def __init__(self, rows: Iterable[T], columns: Mapping[int, KeyDictionary]) -> None:
+        self.rows = rows
+        self.columns = dict(columns)
+
+    def __iter__(self) -> Iterator[T]:
+        columns = [(idx, d.encode) for idx, d in self.columns.items()]
+        for row in self.rows:
+            values = (
+                row if isinstance(row, tuple) else row_layout(type(row)).values(row)
+            )
+            yield _replace_fields(
+                row, {idx: encode(values[idx]) for idx, encode in columns}
+            )
+
+
+def encode_columns(
+    dataset: BaseDataset[T], columns: Mapping[int, KeyDictionary]
+) -> BaseDataset[T]:
+    """
+    Return `dataset` with the fields at the indexes in `columns` encoded lazily.
+    """
+    return BaseDataset[T](rows=EncodedRows(dataset.rows, columns))
+
+
+def decode_columns(
+    dataset: BaseDataset[T], columns: Mapping[int, KeyDictionary]
+) -> BaseDataset[T]:
+    """
+    Return the rows of `dataset` with the codes in the fields at the indexes in
+    `columns` mapped back to their keys. Rows may be dataclasses or plain tuples.
+    """
+    decoders = [(idx, d.decode) for idx, d in columns.items()]
+    decoded = []
+    for row in dataset:
+        values = row if isinstance(row, tuple) else row_layout(type(row)).values(row)
+        decoded.append(
+            _replace_fields(row, {idx: decode(values[idx]) for idx, decode in decoders})
+        )
+    return BaseDataset[T](rows=decoded)
+
+
+def encode_dataset(
+    dataset: BaseDataset[T], key_idx: int, dictionary: KeyDictionary
+) -> BaseDataset[T]:
+    """
+    Return `dataset` with its join keys replaced by codes from `dictionary`.
+    """
+    return encode_columns(dataset, {key_idx: dictionary})
+
+
+def decode_dataset(
+    dataset: BaseDataset[T], key_idx: int, dictionary: KeyDictionary
+) -> BaseDataset[T]:
+    """
+    Return the rows of `dataset` with the codes in field `key_idx` mapped back to keys.
+    """
+    return decode_columns(dataset, {key_idx: dictionary})
+
+
+def join_encoded(
+    joiner: Any,
+    dataset1: BaseDataset,
+    dataset2: BaseDataset,
+    build_key_idx: int,
+    probe_key_idx: int,
+    config: JoinConfig,
+    materialize: bool = False,
+) -> BaseDataset:
+    """
+    Run `joiner.join` on dictionary-encoded keys and decode the keys of the result.
+
+    Every algorithm places the join key at `build_key_idx` of its result rows, which is
+    the only field that has to be decoded. Spill files written during the join hold
+    the integer codes instead of the original keys.
+
+    Inputs are encoded lazily while the joiner reads them, which suits joiners that
+    read each input once. Joiners that scan their inputs repeatedly pass
+    `materialize=True`, so every row is encoded once up front rather than on each scan.
+
+    The dictionary holds every distinct key in memory. Once the inputs have more than
+    `config.max_encoded_keys` of them, the join is restarted on the plain keys.
+    """
+    plain_config = config.replace(encode_keys=False)
+    dictionary = KeyDictionary(config.max_encoded_keys)
+    try:
+        encoded1 = encode_dataset(dataset1, build_key_idx, dictionary)
+        encoded2 = encode_dataset(dataset2, probe_key_idx, dictionary)
+        if materialize:
+            encoded1 = BaseDataset(rows=list(encoded1))
+            encoded2 = BaseDataset(rows=list(encoded2))
+        result = joiner.join(
+            encoded1, encoded2, build_key_idx, probe_key_idx, plain_config
+        )
+    except KeyDictionaryFullError as e:
+        logger.warning("%s; joining on the plain keys instead", e)
+        return joiner.join(
+            dataset1, dataset2, build_key_idx, probe_key_idx, plain_config
+        )
+    return decode_dataset(result, build_key_idx, dictionary)
@@ -0,0 +1,151 @@
+import logging
+import threading
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import (
+    Any,
+    Callable,
+    ContextManager,
+    Dict,
+    Final,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class JoinMetrics:
+    """
+    Measurements collected during a single `join` call.
+
+    Attributes:
+        algorithm: Name of the algorithm that ran the join.
+        phase_seconds: Wall time per phase, summed over partitions/workers, e.g.
+            build, probe, partition, sort, merge and the overall total.
+        counters: Row, byte and size counters, e.g. build_rows, probe_rows,
+            output_rows, spilled_bytes, spill_files, hash_table_keys.
+        workers: Per-worker stats for the parallel algorithms, indexed by worker id.
+    """
+
+    algorithm: str
+    phase_seconds: Dict[str, float] = field(default_factory=dict)
+    counters: Dict[str, int] = field(default_factory=dict)
+    workers: Dict[int, Dict[str, Any]] = field(default_factory=dict)
+
+    @property
+    def worker_skew(self) -> Optional[float]:
+        """
+        Ratio of the busiest worker's rows to the mean rows per worker; 1.0 is perfectly
+        balanced. None when there are no worker stats.
+        """
+        loads = [
+            w.get("build_rows", 0) + w.get("probe_rows", 0)
+            for w in self.workers.values()
+        ]
+        if not loads or not sum(loads):
+            return None
+        return max(loads) / (sum(loads) / len(loads))
+
+
+MetricsCallback = Callable[[JoinMetrics], None]
+
+
+class MetricsRecorder:
+    """
+    Accumulates the metrics of one join. Thread-safe, so nested joiners and workers can
+    share the recorder of the join that created them.
+    """
+
+    def __init__(self, algorithm: str) -> None:
+        self.metrics = JoinMetrics(algorithm=algorithm)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, perf_counter() - start)
+
+    def add_time(self, name: str, seconds: float) -> None:
+        with self._lock:
+            phases = self.metrics.phase_seconds
+            phases[name] = phases.get(name, 0.0) + seconds
+
+    def incr(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            counters = self.metrics.counters
+            counters[name] = counters.get(name, 0) + value
+
+    def maximum(self, name: str, value: int) -> None:
+        with self._lock:
+            counters = self.metrics.counters
+            counters[name] = max(counters.get(name, value), value)
+
+    def worker(self, worker_id: int, **stats: Any) -> None:
+        with self._lock:
+            self.metrics.workers.setdefault(worker_id, {}).update(stats)
+
+
+class _NullRecorder:
+    """
+    Recorder used when no callback is registered; every method is a no-op.
+    """
+
+    _null_phase: ContextManager[None] = nullcontext()
+
+    def phase(self, name: str) -> ContextManager[None]:
+        return self._null_phase
+
+    def add_time(self, name: str, seconds: float) -> None:
+        pass
+
+    def incr(self, name: str, value: int = 1) -> None:
+        pass
+
+    def maximum(self, name: str, value: int) -> None:
+        pass
+
+    def worker(self, worker_id: int, **stats: Any) -> None:
+        pass
+
+
+NULL_RECORDER: Final = _NullRecorder()
+
+
+def logging_callback(
+    target: Optional[logging.Logger] = None, level: int = logging.INFO
+) -> MetricsCallback:
+    """
+    Return a metrics callback that logs every join's metrics to `target`.
+    """
+    target = target if target is not None else logger
+
+    def log_metrics(metrics: JoinMetrics) -> None:
+        if not target.isEnabledFor(level):
+            return
+        target.log(
+            level,
+            "%s: phases=%s counters=%s worker_skew=%s",
+            metrics.algorithm,
+            {k: round(v, 6) for k, v in metrics.phase_seconds.items()},
+            metrics.counters,
+            metrics.worker_skew,
+        )
+
+    return log_metrics
+
+
+def collecting_callback() -> Tuple[MetricsCallback, List[JoinMetrics]]:
+    """
+    Return a callback that appends every join's metrics to the returned list.
+    """
+    collected: List[JoinMetrics] = []
+    return collected.append, collected
@@ -0,0 +1,307 @@
+import logging
+from dataclasses import dataclass
+from itertools import chain, islice, product
+from typing import (
+    TypeVar,
+    ClassVar,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Protocol,
+    Sequence,
+    Tuple,
+    Union,
+)
+from join_algorithms.base import (
+    BaseAlgorithm,
+    BaseDataset,
+    row_key,
+    row_layout,
+    row_values,
+)
+from join_algorithms.config import JoinConfig
+from join_algorithms.key_encoding import (
+    KeyDictionary,
+    KeyDictionaryFullError,
+    decode_columns,
+    encode_columns,
+)
+from join_algorithms.metrics import MetricsCallback
+
+logger = logging.getLogger(__name__)
+
+
+class DataClassProtocol(Protocol):
+    __dataclass_fields__: ClassVar[Dict[str, Any]]
+
+
+T = TypeVar("T", bound=DataClassProtocol)
+U = TypeVar("U", bound=DataClassProtocol)
+V = TypeVar("V", bound=DataClassProtocol)
+
+
+@dataclass(frozen=True)
+class DimensionJoin:
+    """
+    One dimension input of a multi-way join.
+
+    Attributes:
+        dataset: The dimension rows, which are loaded into a hash table.
+        fact_key_idx: The index of the fact rows' key referencing this dimension.
+        dim_key_idx: The index of the key in the dimension rows.
+    """
+
+    dataset: BaseDataset
+    fact_key_idx: int
+    dim_key_idx: int
+
+
+class MultiHashJoinAlgorithm(BaseAlgorithm[T, U, V]):
+    """
+    Star join of one fact input against any number of dimension inputs.
+
+    Hash tables are built for all dimensions first, then every fact row is streamed
+    through the chain of probes in a single pass, so no intermediate datasets are
+    materialized. A fact row that misses any dimension is dropped as soon as that probe
+    fails, which is why probing the most selective dimension first pays off.
+
+    Result rows hold the fact row's fields followed by each dimension's fields without
+    its key, in the order the dimensions were given, regardless of the probe order.
+    Type parameters are [Fact, Any, Result].
+    """
+
+    algorithm_name = "Multi-way Hash Join"
+    # number of fact rows used to estimate each dimension's selectivity
+    SELECTIVITY_SAMPLE_SIZE: ClassVar[int] = 1000
+
+    def __init__(
+        self,
+        config: Optional[JoinConfig] = None,
+        on_metrics: Optional[MetricsCallback] = None,
+    ):
+        super().__init__(config, on_metrics)
+        self._result_type = self._extract_result_type()
+        self.probe_order: List[int] = []
+
+    def _build_table(
+        self, dimension: DimensionJoin
+    ) -> Tuple[Dict[Any, List[tuple]], int]:
+        """
+        Hash the dimension rows by key, storing each row's fields minus the key so they
+        can be appended to fact rows without any per-match work. Also returns the
+        number of rows read.
+        """
+        key_idx = dimension.dim_key_idx
+        table: Dict[Any, List[tuple]] = {}
+        rows = 0
+        for rows, row in enumerate(dimension.dataset, 1):
+            values = row_values(row)
+            trimmed = values[:key_idx] + values[key_idx + 1 :]
+            table.setdefault(row_key(row, key_idx), []).append(trimmed)
+        return table, rows
+
+    def _selectivity_order(
+        self,
+        fact: BaseDataset[T],
+        tables: List[Dict[Any, List[tuple]]],
+        key_getters: List[Any],
+    ) -> List[int]:
+        """
+        Order the probes by the fraction of sampled fact rows each dimension matches,
+        lowest first, breaking ties by the average number of matches per hit.
+        """
+        sample = list(islice(iter(fact), self.SELECTIVITY_SAMPLE_SIZE))
+        if not sample:
+            return list(range(len(tables)))
+
+        estimates: List[Tuple[float, float, int]] = []
+        for d, (table, key_of) in enumerate(zip(tables, key_getters)):
+            hits = [len(table[k]) for k in map(key_of, sample) if k in table]
+            hit_rate = len(hits) / len(sample)
+            fanout = sum(hits) / len(hits) if hits else 0.0
+            estimates.append((hit_rate, fanout, d))
+        return [d for _, _, d in sorted(estimates)]
+
+    def join_many(
+        self,
+        fact: BaseDataset[T],
+        dimensions: Sequence[Union[DimensionJoin, Tuple[BaseDataset, int, int]]],
+        reorder: bool = False,
+        config: Optional[JoinConfig] = None,
+    ) -> BaseDataset[V]:
+        """
+        Join `fact` against every dimension in one pass.
+
+        Args:
+            fact: The input streamed through the probe chain.
+            dimensions: DimensionJoin specs, or (dataset, fact_key_idx, dim_key_idx).
+            reorder: Probe the dimensions in order of increasing estimated selectivity
+                instead of the given order. The result rows are the same either way.
+            config: Overrides the algorithm's configuration for this call only.
+
+        Returns:
+            A new dataset containing the joined rows.
+        """
+        config = self._resolve_config(config)
+        dims = [
+            d if isinstance(d, DimensionJoin) else DimensionJoin(*d) for d in dimensions
+        ]
+        if config.encode_keys:
+            return self._join_many_encoded(fact, dims, reorder, config)
+
+        key_getters = [self._key_accessor(0, d.fact_key_idx) for d in dims]
+        fact_values = self._fact_values()
+        create_result = self._result_factory()
+
+        with self._measure() as metrics:
+            with metrics.phase("build"):
+                built = [self._build_table(d) for d in dims]
+                tables = [table for table, _ in built]
+
+            order = (
+                self._selectivity_order(fact, tables, key_getters)
+                if reorder
+                else list(range(len(dims)))
+            )
+            self.probe_order = order
+            probes = [(d, tables[d], key_getters[d]) for d in order]
+
+            joined_rows = []
+            fact_rows = 0
+            with metrics.phase("probe"):
+                for row in fact:
+                    fact_rows += 1
+                    matches: List[Any] = [None] * len(dims)
+                    for d, table, key_of in probes:
+                        found = table.get(key_of(row))
+                        if found is None:
+                            break
+                        matches[d] = found
+                    else:
+                        base = fact_values(row)
+                        for combo in product(*matches):
+                            combined_tuple = base + tuple(chain.from_iterable(combo))
+                            joined_rows.append(create_result(combined_tuple))
+
+            metrics.incr("build_rows", sum(rows for _, rows in built))
+            metrics.incr("probe_rows", fact_rows)
+            metrics.incr("output_rows", len(joined_rows))
+            metrics.incr("hash_table_keys", sum(len(t) for t in tables))
+            metrics.maximum("max_hash_table_keys", max(map(len, tables), default=0))
+
+        return BaseDataset[V](rows=joined_rows)
+
+    def _join_many_encoded(
+        self,
+        fact: BaseDataset[T],
+        dims: List[DimensionJoin],
+        reorder: bool,
+        config: JoinConfig,
+    ) -> BaseDataset[V]:
+        """
+        `join_many` on dictionary-encoded keys. Dimensions referenced by the same fact
+        column share a dictionary, and the fact's key columns are decoded in the
+        result, where they keep their positions.
+        """
+        plain_config = config.replace(encode_keys=False)
+        dictionaries = {
+            d.fact_key_idx: KeyDictionary(config.max_encoded_keys) for d in dims
+        }
+        encoded_dims = [
+            DimensionJoin(
+                encode_columns(
+                    d.dataset, {d.dim_key_idx: dictionaries[d.fact_key_idx]}
+                ),
+                d.fact_key_idx,
+                d.dim_key_idx,
+            )
+            for d in dims
+        ]
+        try:
+            result = self.join_many(
+                encode_columns(fact, dictionaries), encoded_dims, reorder, plain_config
+            )
+        except KeyDictionaryFullError as e:
+            logger.warning("%s; joining on the plain keys instead", e)
+            return self.join_many(fact, dims, reorder, plain_config)
+        return decode_columns(result, dictionaries)
+
+    def _fact_values(self) -> Callable[[Any], tuple]:
+        fact_type = self._row_types[0] if self._row_types else None
+        if fact_type is not None:
+            return row_layout(fact_type).values
+        return row_values
+
+    def join(
+        self,
+        dataset1: BaseDataset[T],
+        dataset2: BaseDataset[U],
+        build_key_idx: int,
+        probe_key_idx: int,
+        config: Optional[JoinConfig] = None,
+    ) -> BaseDataset[V]:
+        """
+        Two-way join with the same result layout as the other algorithms: dataset1 is
+        streamed as the fact input and dataset2 is hashed as the only dimension.
+        """
+        return self.join_many(
+            dataset1,
+            [DimensionJoin(dataset2, build_key_idx, probe_key_idx)],
+            config=config,
+        )
+
+
+if __name__ == "__main__":
+    from dataclasses import dataclass
+
+    @dataclass(slots=True, frozen=True)
+    class Sale:
+        id: int
+        customer_id: int
+        product_id: int
+        amount: float
+
+    @dataclass(slots=True, frozen=True)
+    class Customer:
+        id: int
+        name: str
+
+    @dataclass(slots=True, frozen=True)
+    class Product:
+        id: int
+        title: str
+
+    @dataclass(slots=True, frozen=True)
+    class SaleDetail:
+        id: int
+        customer_id: int
+        product_id: int
+        amount: float
+        name: str
+        title: str
+
+    sales = BaseDataset[Sale](
+        rows=[Sale(i, i % 3, i % 4, float(i) * 10) for i in range(8)]
+    )
+    customers = BaseDataset[Customer](
+        rows=[Customer(0, "Alice"), Customer(1, "Bob")]
+    )
+    products = BaseDataset[Product](
+        rows=[Product(0, "Pen"), Product(1, "Ink"), Product(3, "Pad")]
+    )
+
+    multi_join = MultiHashJoinAlgorithm[Sale, Any, SaleDetail]()
+    print(multi_join.algorithm_name)
+    print(
+        multi_join.join_many(
+            sales,
+            [
+                DimensionJoin(customers, fact_key_idx=1, dim_key_idx=0),
+                DimensionJoin(products, fact_key_idx=2, dim_key_idx=0),
+            ],
+            reorder=True,
+        )
+    )
+    print(f"Probe order: {multi_join.probe_order}")
@@ -1,9 +1,19 @@
+import logging
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import TypeVar, Final, ClassVar, Any, Dict, Protocol
-from dataclasses import astuple
+from time import perf_counter
+from typing import TypeVar, ClassVar, Any, Dict, Protocol, Optional, Union
 from join_algorithms.base import BaseAlgorithm, BaseDataset
 from join_algorithms.hash_join import HashJoinAlgorithm
-from join_algorithms.config import DEFAULT_CONFIG
+from join_algorithms.config import JoinConfig
+from join_algorithms.key_encoding import join_encoded
+from join_algorithms.metrics import (
+    NULL_RECORDER,
+    MetricsCallback,
+    MetricsRecorder,
+    _NullRecorder,
+)
+
+logger = logging.getLogger(__name__)
 
 
 class DataClassProtocol(Protocol):
@@ -16,11 +26,14 @@ V = TypeVar("V", bound=DataClassProtocol)
 
 
 class ParallelHashJoinAlgorithm(BaseAlgorithm[T, U, V]):
-    NUM_WORKERS: Final[int] = DEFAULT_CONFIG.PARALLEL_WORKERS
     algorithm_name = "Parallel Hash Join"
 
-    def __init__(self) -> None:
-        super().__init__()
+    def __init__(
+        self,
+        config: Optional[JoinConfig] = None,
+        on_metrics: Optional[MetricsCallback] = None,
+    ) -> None:
+        super().__init__(config, on_metrics)
 
     def _worker_join(
         self,
@@ -29,6 +42,8 @@ class ParallelHashJoinAlgorithm(BaseAlgorithm[T, U, V]):
         dataset2_chunk: BaseDataset[U],
         build_key_idx: int,
         probe_key_idx: int,
+        config: JoinConfig,
+        metrics: Union[MetricsRecorder, _NullRecorder] = NULL_RECORDER,
     ) -> BaseDataset[V]:
         """
         Worker function to perform hash join on partitions of the datasets.
@@ -36,29 +51,39 @@ class ParallelHashJoinAlgorithm(BaseAlgorithm[T, U, V]):
         If we pre-partition, we scan and send only relevant partitions to each worker.
         """
         a_partition, b_partition = [], []
-        if hasattr(self, "_type_params") and len(getattr(self, "_type_params")) >= 3:
-            params = getattr(self, "_type_params")
-            hash_joiner_class = HashJoinAlgorithm[params[0], params[1], params[2]]
-            hash_joiner = hash_joiner_class()
-        else:
-            hash_joiner = HashJoinAlgorithm()
-            hash_joiner._result_type = self._result_type
-
-        for row in dataset1:
-            if hash(astuple(row)[build_key_idx]) % self.NUM_WORKERS == worker_id:
-                a_partition.append(row)
-
-        for row in dataset2_chunk:
-            if hash(astuple(row)[probe_key_idx]) % self.NUM_WORKERS == worker_id:
-                b_partition.append(row)
-
-        print(
-            f"Worker {worker_id} processing {len(a_partition)} rows from dataset1 and {len(b_partition)} rows from dataset2."
+        num_workers = config.num_workers
+        build_key = self._key_accessor(0, build_key_idx)
+        probe_key = self._key_accessor(1, probe_key_idx)
+        hash_joiner = self._make_joiner(HashJoinAlgorithm, config, metrics)
+        start = perf_counter()
+
+        with metrics.phase("partition"):
+            for row in dataset1:
+                if hash(build_key(row)) % num_workers == worker_id:
+                    a_partition.append(row)
+
+            for row in dataset2_chunk:
+                if hash(probe_key(row)) % num_workers == worker_id:
+                    b_partition.append(row)
+
+        logger.debug(
+            "Worker %d processing %d rows from dataset1 and %d rows from dataset2.",
+            worker_id,
+            len(a_partition),
+            len(b_partition),
         )
 
         a_dataset = BaseDataset[T](rows=a_partition)
         b_dataset = BaseDataset[U](rows=b_partition)
-        return hash_joiner.join(a_dataset, b_dataset, build_key_idx, probe_key_idx)
+        result = hash_joiner.join(a_dataset, b_dataset, build_key_idx, probe_key_idx)
+        metrics.worker(
+            worker_id,
+            build_rows=len(a_partition),
+            probe_rows=len(b_partition),
+            output_rows=len(result.rows),
+            seconds=perf_counter() - start,
+        )
+        return result
 
     def join(
         self,
@@ -66,10 +91,25 @@ class ParallelHashJoinAlgorithm(BaseAlgorithm[T, U, V]):
         dataset2: BaseDataset[U],
         build_key_idx: int,
         probe_key_idx: int,
+        config: Optional[JoinConfig] = None,
     ) -> BaseDataset[V]:
+        config = self._resolve_config(config)
+        if config.encode_keys:
+            # every worker scans both inputs, so they are encoded once up front
+            return join_encoded(
+                self,
+                dataset1,
+                dataset2,
+                build_key_idx,
+                probe_key_idx,
+                config,
+                materialize=True,
+            )
         joined_rows = []
 
-        with ThreadPoolExecutor(max_workers=self.NUM_WORKERS) as executor:
+        with self._measure() as metrics, ThreadPoolExecutor(
+            max_workers=config.num_workers
+        ) as executor:
             futures = [
                 executor.submit(
                     self._worker_join,
@@ -78,19 +118,19 @@ class ParallelHashJoinAlgorithm(BaseAlgorithm[T, U, V]):
                     dataset2,
                     build_key_idx,
                     probe_key_idx,
+                    config,
+                    metrics,
                 )
-                for worker_id in range(self.NUM_WORKERS)
+                for worker_id in range(config.num_workers)
             ]
             for future in as_completed(futures):
                 try:
                     worker_result = future.result()
                     joined_rows.extend(worker_result.rows)
                 except Exception as e:
-                    print(f"Worker encountered an error: {e}")
+                    logger.error("Worker encountered an error: %s", e)
                     raise
 
-        print("Sample joined rows:")
-        print("\n".join(map(str, joined_rows[:10])))
         return BaseDataset[V](rows=joined_rows)
 
 
@@ -1,6 +1,9 @@
-from typing import TypeVar, ClassVar, Any, Dict, Protocol
-from dataclasses import astuple
+import heapq
+from typing import TypeVar, ClassVar, Any, Dict, Protocol, Optional, Tuple, List
 from join_algorithms.base import BaseAlgorithm, BaseDataset
+from join_algorithms.config import JoinConfig
+from join_algorithms.key_encoding import join_encoded
+from join_algorithms.metrics import MetricsCallback
 
 
 class DataClassProtocol(Protocol):
@@ -15,8 +18,12 @@ V = TypeVar("V", bound=DataClassProtocol)
 class SortMergeJoinAlgorithm(BaseAlgorithm[T, U, V]):
     algorithm_name = "Sort Merge Join"
 
-    def __init__(self):
-        super().__init__()
+    def __init__(
+        self,
+        config: Optional[JoinConfig] = None,
+        on_metrics: Optional[MetricsCallback] = None,
+    ):
+        super().__init__(config, on_metrics)
         self._result_type = self._extract_result_type()
 
     def join(
@@ -25,56 +32,229 @@ class SortMergeJoinAlgorithm(BaseAlgorithm[T, U, V]):
         dataset2: BaseDataset[U],
         build_key_idx: int,
         probe_key_idx: int,
+        config: Optional[JoinConfig] = None,
     ) -> BaseDataset[V]:
-        # sort phase
-        sorted_dataset1 = sorted(dataset1, key=lambda row: astuple(row)[build_key_idx])
-        sorted_dataset2 = sorted(dataset2, key=lambda row: astuple(row)[probe_key_idx])
-
-        # merge phase
-        i, j = 0, 0
-        joined_rows = []
-
-        while i < len(sorted_dataset1) and j < len(sorted_dataset2):
-            row1 = sorted_dataset1[i]
-            row2 = sorted_dataset2[j]
-            key1 = astuple(row1)[build_key_idx]
-            key2 = astuple(row2)[probe_key_idx]
-
-            if key1 < key2:
-                i += 1
-            elif key1 > key2:
-                j += 1
-            else:
-                current_key = key1
-
-                # get all matching rows in dataset1 and dataset2
-                i_start = i
-                j_start = j
-
-                while (
-                    i < len(sorted_dataset1)
-                    and astuple(sorted_dataset1[i])[build_key_idx] == current_key
-                ):
-                    i += 1
+        config = self._resolve_config(config)
+        if config.encode_keys:
+            return join_encoded(
+                self, dataset1, dataset2, build_key_idx, probe_key_idx, config
+            )
+        build_key = self._key_accessor(0, build_key_idx)
+        probe_key = self._key_accessor(1, probe_key_idx)
+        combine_rows = self._row_combiner(probe_key_idx)
+        create_result = self._result_factory()
+
+        with self._measure() as metrics:
+            # sort phase
+            with metrics.phase("sort"):
+                sorted_dataset1 = sorted(dataset1, key=build_key)
+                sorted_dataset2 = sorted(dataset2, key=probe_key)
+
+            # merge phase
+            with metrics.phase("merge"):
+                i, j = 0, 0
+                joined_rows = []
+
+                while i < len(sorted_dataset1) and j < len(sorted_dataset2):
+                    row1 = sorted_dataset1[i]
+                    row2 = sorted_dataset2[j]
+                    key1 = build_key(row1)
+                    key2 = probe_key(row2)
+
+                    if key1 < key2:
+                        i += 1
+                    elif key1 > key2:
+                        j += 1
+                    else:
+                        current_key = key1
+
+                        # get all matching rows in dataset1 and dataset2
+                        i_start = i
+                        j_start = j
+
+                        while (
+                            i < len(sorted_dataset1)
+                            and build_key(sorted_dataset1[i]) == current_key
+                        ):
+                            i += 1
+
+                        while (
+                            j < len(sorted_dataset2)
+                            and probe_key(sorted_dataset2[j]) == current_key
+                        ):
+                            j += 1
+
+                        i_end = i
+                        j_end = j
+
+                        # cartesian
+                        for row1_idx in range(i_start, i_end):
+                            for row2_idx in range(j_start, j_end):
+                                row1 = sorted_dataset1[row1_idx]
+                                row2 = sorted_dataset2[row2_idx]
+
+                                combined_tuple = combine_rows(row1, row2)
+                                result_obj = create_result(combined_tuple)
+                                joined_rows.append(result_obj)
+
+            metrics.incr("build_rows", len(sorted_dataset1))
+            metrics.incr("probe_rows", len(sorted_dataset2))
+            metrics.incr("output_rows", len(joined_rows))
+
+        return BaseDataset[V](rows=joined_rows)
+
+    def _reject_encoded_keys(self, config: JoinConfig, method: str) -> None:
+        if config.encode_keys:
+            raise ValueError(
+                f"{method} compares keys by value and order, so it cannot run on "
+                "dictionary-encoded keys; pass a config with encode_keys=False"
+            )
+
+    def band_join(
+        self,
+        dataset1: BaseDataset[T],
+        dataset2: BaseDataset[U],
+        build_key_idx: int,
+        probe_key_idx: int,
+        before: Any,
+        after: Any,
+        config: Optional[JoinConfig] = None,
+    ) -> BaseDataset[V]:
+        """
+        Join rows whose keys are within a band of each other:
+
+            row1.key BETWEEN row2.key - before AND row2.key + after
+
+        Both inputs are sorted and merged with a sliding window over dataset1, whose
+        bounds only ever move forward, so the cost is O((n + m) log + output).
+        Unlike `join`, the probe key is kept in the result since it differs from the
+        build key; results hold all fields of row1 followed by all fields of row2.
+
+        Raises ValueError if the resolved config has `encode_keys` set: the band is
+        computed from the keys themselves, which dictionary codes do not preserve.
+        """
+        config = self._resolve_config(config)
+        self._reject_encoded_keys(config, "band_join")
+        build_key = self._key_accessor(0, build_key_idx)
+        probe_key = self._key_accessor(1, probe_key_idx)
+        combine_rows = self._row_combiner(None)
+        create_result = self._result_factory()
+
+        with self._measure() as metrics:
+            with metrics.phase("sort"):
+                sorted_dataset1 = sorted(dataset1, key=build_key)
+                sorted_dataset2 = sorted(dataset2, key=probe_key)
+                keys1 = [build_key(row) for row in sorted_dataset1]
+
+            with metrics.phase("merge"):
+                joined_rows = []
+                lo, hi = 0, 0
+                n = len(sorted_dataset1)
+
+                for row2 in sorted_dataset2:
+                    key2 = probe_key(row2)
+                    lower, upper = key2 - before, key2 + after
+
+                    # slide the window [lo, hi) over dataset1
+                    while lo < n and keys1[lo] < lower:
+                        lo += 1
+                    if hi < lo:
+                        hi = lo
+                    while hi < n and keys1[hi] <= upper:
+                        hi += 1
+
+                    for row1_idx in range(lo, hi):
+                        combined_tuple = combine_rows(sorted_dataset1[row1_idx], row2)
+                        joined_rows.append(create_result(combined_tuple))
+
+            metrics.incr("build_rows", len(sorted_dataset1))
+            metrics.incr("probe_rows", len(sorted_dataset2))
+            metrics.incr("output_rows", len(joined_rows))
+
+        return BaseDataset[V](rows=joined_rows)
+
+    def interval_join(
+        self,
+        dataset1: BaseDataset[T],
+        dataset2: BaseDataset[U],
+        build_interval_idx: Tuple[int, int],
+        probe_interval_idx: Tuple[int, int],
+        config: Optional[JoinConfig] = None,
+    ) -> BaseDataset[V]:
+        """
+        Join rows whose closed intervals overlap, i.e. row1.start <= row2.end and
+        row2.start <= row1.end. Each interval is given as (start_idx, end_idx).
 
-                while (
-                    j < len(sorted_dataset2)
-                    and astuple(sorted_dataset2[j])[probe_key_idx] == current_key
+        Both inputs are sorted by start and swept in a single merge. Each side keeps a
+        min-heap of its open intervals keyed by end; when an interval starts, the other
+        side's intervals that already ended are dropped, and every remaining one
+        overlaps it. The cost is O((n + m) log + output).
+        Results hold all fields of row1 followed by all fields of row2.
+
+        Raises ValueError if the resolved config has `encode_keys` set, since
+        dictionary codes do not preserve the order of the interval bounds.
+        """
+        config = self._resolve_config(config)
+        self._reject_encoded_keys(config, "interval_join")
+        starts = (
+            self._key_accessor(0, build_interval_idx[0]),
+            self._key_accessor(1, probe_interval_idx[0]),
+        )
+        ends = (
+            self._key_accessor(0, build_interval_idx[1]),
+            self._key_accessor(1, probe_interval_idx[1]),
+        )
+        combine_rows = self._row_combiner(None)
+        create_result = self._result_factory()
+
+        with self._measure() as metrics:
+            with metrics.phase("sort"):
+                sorted_datasets = (
+                    sorted(dataset1, key=starts[0]),
+                    sorted(dataset2, key=starts[1]),
+                )
+
+            with metrics.phase("merge"):
+                joined_rows = []
+                # (end, sequence, row) per side; the sequence keeps rows from
+                # ever being compared
+                active: Tuple[List[Any], List[Any]] = ([], [])
+                positions = [0, 0]
+                sequence = 0
+
+                while positions[0] < len(sorted_datasets[0]) or positions[1] < len(
+                    sorted_datasets[1]
                 ):
-                    j += 1
+                    # take the next interval to start, from either side
+                    if positions[1] >= len(sorted_datasets[1]) or (
+                        positions[0] < len(sorted_datasets[0])
+                        and starts[0](sorted_datasets[0][positions[0]])
+                        <= starts[1](sorted_datasets[1][positions[1]])
+                    ):
+                        side = 0
+                    else:
+                        side = 1
+                    row = sorted_datasets[side][positions[side]]
+                    positions[side] += 1
+                    start = starts[side](row)
+
+                    other = active[1 - side]
+                    while other and other[0][0] < start:
+                        heapq.heappop(other)
 
-                i_end = i
-                j_end = j
+                    for _, _, other_row in other:
+                        if side == 0:
+                            combined_tuple = combine_rows(row, other_row)
+                        else:
+                            combined_tuple = combine_rows(other_row, row)
+                        joined_rows.append(create_result(combined_tuple))
 
-                # cartesian
-                for row1_idx in range(i_start, i_end):
-                    for row2_idx in range(j_start, j_end):
-                        row1 = sorted_dataset1[row1_idx]
-                        row2 = sorted_dataset2[row2_idx]
+                    heapq.heappush(active[side], (ends[side](row), sequence, row))
+                    sequence += 1
 
-                        combined_tuple = self._combine_rows(row1, row2, probe_key_idx)
-                        result_obj = self._create_result_object(combined_tuple)
-                        joined_rows.append(result_obj)
+            metrics.incr("build_rows", len(sorted_datasets[0]))
+            metrics.incr("probe_rows", len(sorted_datasets[1]))
+            metrics.incr("output_rows", len(joined_rows))
 
         return BaseDataset[V](rows=joined_rows)
 
@@ -0,0 +1,182 @@
+import os
+import bz2
+import logging
+import lzma
+import pickle
+import shutil
+import struct
+import tempfile
+import threading
+import zlib
+from typing import IO, Any, BinaryIO, Iterator, List, Optional, Sequence
+
+
+logger = logging.getLogger(__name__)
+
+
+class SpillQuotaExceededError(RuntimeError):
+    pass
+
+
+_BATCH_HEADER = struct.Struct("<Q")
+
+_COMPRESSORS = {
+    "none": (lambda data: data, lambda data: data),
+    "zlib": (zlib.compress, zlib.decompress),
+    "bz2": (bz2.compress, bz2.decompress),
+    "lzma": (lzma.compress, lzma.decompress),
+}
+
+
+def encode_batch(rows: Sequence[Any], codec: str = "none") -> bytes:
+    """
+    Serialize rows into a length-prefixed, optionally compressed batch of pickled rows.
+    """
+    compress, _ = _COMPRESSORS[codec]
+    payload = compress(pickle.dumps(list(rows), protocol=pickle.HIGHEST_PROTOCOL))
+    return _BATCH_HEADER.pack(len(payload)) + payload
+
+
+def read_batch(f: BinaryIO, codec: str = "none") -> Optional[List[Any]]:
+    """
+    Read the rows of the batch at the current position, or None at the end of `f`.
+    """
+    _, decompress = _COMPRESSORS[codec]
+    header = f.read(_BATCH_HEADER.size)
+    if len(header) < _BATCH_HEADER.size:
+        return None
+    (size,) = _BATCH_HEADER.unpack(header)
+    return pickle.loads(decompress(f.read(size)))
+
+
+def read_batches(f: BinaryIO, codec: str = "none") -> Iterator[Any]:
+    """
+    Yield the rows of every batch from the current position to the end of `f`.
+    """
+    while True:
+        rows = read_batch(f, codec)
+        if rows is None:
+            return
+        yield from rows
+
+
+class SpillManager:
+    """
+    Owns the scratch space of a single disk-based join.
+
+    Every manager allocates its own uniquely named directory under `base_dir`, so any
+    number of joins can spill concurrently without clobbering each other's files. The
+    bytes written through the manager are tracked against an optional quota, and the
+    whole directory is removed when the manager is closed (or its `with` block exits).
+
+    Usage:
+        with SpillManager(base_dir="/mnt/nvme/spill", quota_bytes=1 << 30) as spill:
+            f = spill.open("partition1_0.tmp", "wb+")
+            spill.write_batch(f, rows, codec="zlib")
+    """
+
+    def __init__(
+        self,
+        base_dir: Optional[str] = None,
+        quota_bytes: Optional[int] = None,
+        prefix: str = "join_",
+    ) -> None:
+        if quota_bytes is not None and quota_bytes < 0:
+            raise ValueError(f"quota_bytes must be non-negative, got {quota_bytes}")
+        if base_dir is not None:
+            os.makedirs(base_dir, exist_ok=True)
+
+        self.quota_bytes = quota_bytes
+        self.directory = tempfile.mkdtemp(prefix=prefix, dir=base_dir)
+        self._spilled_bytes = 0
+        self._num_files = 0
+        self._open_files: List[IO[Any]] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @property
+    def spilled_bytes(self) -> int:
+        return self._spilled_bytes
+
+    @property
+    def num_files(self) -> int:
+        return self._num_files
+
+    def new_path(self, prefix: str = "spill", suffix: str = ".tmp") -> str:
+        """
+        Return a fresh path inside this join's scratch directory.
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("SpillManager is already closed")
+            self._num_files += 1
+            n = self._num_files
+        return os.path.join(self.directory, f"{prefix}_{n}{suffix}")
+
+    def open(self, name: str, mode: str = "w+") -> IO[Any]:
+        """
+        Open a named file inside the scratch directory. The file is closed on cleanup.
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("SpillManager is already closed")
+            self._num_files += 1
+            f = open(os.path.join(self.directory, name), mode)
+            self._open_files.append(f)
+        return f
+
+    def account(self, nbytes: int) -> None:
+        """
+        Record `nbytes` of data about to be spilled. Raises without recording anything
+        if that would exceed the quota, so call it before writing the bytes.
+        """
+        with self._lock:
+            spilled = self._spilled_bytes + nbytes
+            if self.quota_bytes is not None and spilled > self.quota_bytes:
+                raise SpillQuotaExceededError(
+                    f"Spilling {nbytes} more bytes would exceed the quota of "
+                    f"{self.quota_bytes} ({self._spilled_bytes} spilled so far)"
+                )
+            self._spilled_bytes = spilled
+
+    def account_file(self, path: str) -> None:
+        """
+        Record the size of a file written outside the manager, e.g. by a worker process.
+        The file is already on disk, so the quota can only be enforced after the fact.
+        """
+        self.account(os.path.getsize(path))
+
+    def write_batch(self, f: BinaryIO, rows: Sequence[Any], codec: str = "none") -> int:
+        """
+        Encode a batch, account for it against the quota and only then write it to `f`.
+        """
+        data = encode_batch(rows, codec)
+        self.account(len(data))
+        return f.write(data)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            open_files, self._open_files = self._open_files, []
+
+        for f in open_files:
+            try:
+                f.close()
+            except Exception as e:
+                logger.warning("Error closing spill file %s: %s", f.name, e)
+        try:
+            shutil.rmtree(self.directory)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(
+                "Error cleaning up spill directory %s: %s", self.directory, e
+            )
+
+    def __enter__(self) -> "SpillManager":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,351 @@
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from itertools import zip_longest
+from time import monotonic
+from typing import (
+    TypeVar,
+    ClassVar,
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Protocol,
+    Tuple,
+    Union,
+)
+from join_algorithms.base import BaseAlgorithm, BaseDataset
+from join_algorithms.config import JoinConfig
+from join_algorithms.key_encoding import join_encoded
+from join_algorithms.metrics import MetricsCallback
+
+
+class DataClassProtocol(Protocol):
+    __dataclass_fields__: ClassVar[Dict[str, Any]]
+
+
+T = TypeVar("T", bound=DataClassProtocol)
+U = TypeVar("U", bound=DataClassProtocol)
+V = TypeVar("V", bound=DataClassProtocol)
+
+LEFT, RIGHT = 0, 1
+_DONE = object()
+
+
+@dataclass(frozen=True)
+class JoinWindow:
+    """
+    Bounds how long rows stay joinable, and so how much memory the join holds.
+
+    Attributes:
+        max_rows: Keep at most this many of the most recent rows per side.
+        max_age_seconds: Evict rows older than this relative to the newest row seen.
+            Rows only match when their timestamps are at most this far apart, and rows
+            arriving already older than that are dropped.
+        timestamp: Extracts an event time in seconds from a row. Defaults to the
+            arrival time on the monotonic clock.
+    """
+
+    max_rows: Optional[int] = None
+    max_age_seconds: Optional[float] = None
+    timestamp: Optional[Callable[[Any], float]] = None
+
+    def __post_init__(self) -> None:
+        if self.max_rows is not None and self.max_rows < 1:
+            raise ValueError(f"max_rows must be positive, got {self.max_rows}")
+        if self.max_age_seconds is not None and self.max_age_seconds < 0:
+            raise ValueError(
+                f"max_age_seconds must be non-negative, got {self.max_age_seconds}"
+            )
+
+
+class _SymmetricState:
+    """
+    The two hash tables of a symmetric hash join plus their eviction queues.
+    """
+
+    def __init__(
+        self,
+        key_getters: Tuple[Callable[[Any], Any], Callable[[Any], Any]],
+        combine_rows: Callable[[Any, Any], tuple],
+        create_result: Callable[[tuple], Any],
+        window: Optional[JoinWindow],
+    ) -> None:
+        self.key_getters = key_getters
+        self.combine_rows = combine_rows
+        self.create_result = create_result
+        self.window = window
+        # key -> (timestamp, row) per side, oldest first
+        self.tables: Tuple[Dict[Any, Deque[Tuple[float, Any]]], ...] = ({}, {})
+        # (timestamp, key) per side, in arrival order, for eviction
+        self.arrivals: Tuple[Deque[Tuple[float, Any]], ...] = (deque(), deque())
+        self.rows_in = [0, 0]
+        self.output_rows = 0
+        self.evicted_rows = 0
+        self.late_rows = 0
+        self.max_table_rows = 0
+        self._latest = float("-inf")
+
+    def insert(self, side: int, row: Any) -> List[Any]:
+        """
+        Add `row` to its side's table and return its matches against the other side.
+        """
+        key = self.key_getters[side](row)
+        self.rows_in[side] += 1
+
+        window = self.window
+        ts = 0.0
+        max_age = None
+        if window is not None:
+            ts = window.timestamp(row) if window.timestamp is not None else monotonic()
+            max_age = window.max_age_seconds
+            if max_age is not None:
+                horizon = max(self._latest, ts) - max_age
+                if ts < horizon:
+                    # a late row is already outside the window, so it can never match
+                    self.late_rows += 1
+                    return []
+                # expire first so the new row cannot match rows outside the window
+                self._evict_expired(horizon)
+            self._latest = max(self._latest, ts)
+
+        results = []
+        matches = self.tables[1 - side].get(key)
+        if matches:
+            combine_rows, create_result = self.combine_rows, self.create_result
+            if max_age is None:
+                others = [other for _, other in matches]
+            else:
+                # out-of-order rows can outlive the horizon behind newer ones, so
+                # check the distance of every match as well
+                others = [
+                    other
+                    for other_ts, other in matches
+                    if abs(other_ts - ts) <= max_age
+                ]
+            if side == LEFT:
+                for other in others:
+                    results.append(create_result(combine_rows(row, other)))
+            else:
+                for other in others:
+                    results.append(create_result(combine_rows(other, row)))
+            self.output_rows += len(results)
+
+        table = self.tables[side]
+        bucket = table.get(key)
+        if bucket is None:
+            bucket = table[key] = deque()
+        bucket.append((ts, row))
+
+        if window is not None:
+            self.arrivals[side].append((ts, key))
+            if window.max_rows is not None:
+                while len(self.arrivals[side]) > window.max_rows:
+                    self._evict_oldest(side)
+            self.max_table_rows = max(
+                self.max_table_rows,
+                len(self.arrivals[LEFT]) + len(self.arrivals[RIGHT]),
+            )
+        return results
+
+    def _evict_expired(self, horizon: float) -> None:
+        for side in (LEFT, RIGHT):
+            arrivals = self.arrivals[side]
+            while arrivals and arrivals[0][0] < horizon:
+                self._evict_oldest(side)
+
+    def _evict_oldest(self, side: int) -> None:
+        _, key = self.arrivals[side].popleft()
+        table = self.tables[side]
+        bucket = table[key]
+        # rows of a key are appended in arrival order, so the oldest is leftmost
+        bucket.popleft()
+        if not bucket:
+            del table[key]
+        self.evicted_rows += 1
+
+
+class SymmetricHashJoinAlgorithm(BaseAlgorithm[T, U, V]):
+    """
+    Pipelined hash join for unbounded inputs.
+
+    Both inputs get a hash table. Every arriving row is inserted into its own side's
+    table and immediately probes the other side's, so results are produced as soon as
+    both matching rows have arrived instead of after a full build phase. A `JoinWindow`
+    evicts old rows to keep memory bounded on infinite streams.
+
+    Result rows have the same layout as the other algorithms (left row followed by the
+    right row without its key), whichever side arrived last.
+    """
+
+    algorithm_name = "Symmetric Hash Join"
+
+    def __init__(
+        self,
+        config: Optional[JoinConfig] = None,
+        on_metrics: Optional[MetricsCallback] = None,
+    ):
+        super().__init__(config, on_metrics)
+        self._result_type = self._extract_result_type()
+
+    def _new_state(
+        self, build_key_idx: int, probe_key_idx: int, window: Optional[JoinWindow]
+    ) -> _SymmetricState:
+        return _SymmetricState(
+            (
+                self._key_accessor(LEFT, build_key_idx),
+                self._key_accessor(RIGHT, probe_key_idx),
+            ),
+            self._row_combiner(probe_key_idx),
+            self._result_factory(),
+            window,
+        )
+
+    def _record(self, metrics: Any, state: _SymmetricState) -> None:
+        metrics.incr("build_rows", state.rows_in[LEFT])
+        metrics.incr("probe_rows", state.rows_in[RIGHT])
+        metrics.incr("output_rows", state.output_rows)
+        metrics.incr("evicted_rows", state.evicted_rows)
+        metrics.incr("late_rows", state.late_rows)
+        if state.window is None:
+            # nothing is ever evicted, so every row is still in a table
+            state.max_table_rows = sum(state.rows_in)
+        metrics.maximum("max_hash_table_rows", state.max_table_rows)
+
+    def stream(
+        self,
+        left: Iterable[T],
+        right: Iterable[U],
+        build_key_idx: int,
+        probe_key_idx: int,
+        window: Optional[JoinWindow] = None,
+    ) -> Iterator[V]:
+        """
+        Join two synchronous iterables, alternating between them one row at a time and
+        yielding each result as soon as it is found.
+        """
+        state = self._new_state(build_key_idx, probe_key_idx, window)
+        with self._measure() as metrics:
+            try:
+                for left_row, right_row in zip_longest(left, right, fillvalue=_DONE):
+                    if left_row is not _DONE:
+                        yield from state.insert(LEFT, left_row)
+                    if right_row is not _DONE:
+                        yield from state.insert(RIGHT, right_row)
+            finally:
+                self._record(metrics, state)
+
+    async def astream(
+        self,
+        left: Union[Iterable[T], AsyncIterable[T]],
+        right: Union[Iterable[U], AsyncIterable[U]],
+        build_key_idx: int,
+        probe_key_idx: int,
+        window: Optional[JoinWindow] = None,
+    ) -> AsyncIterator[V]:
+        """
+        Join two sync or async iterables, processing rows in the order they arrive:
+
+            async for row in joiner.astream(left_events, right_events, 0, 0):
+                ...
+
+        Both inputs are consumed by background tasks into a queue bounded by
+        `config.batch_size`, so a slow consumer applies backpressure to the producers.
+        """
+        state = self._new_state(build_key_idx, probe_key_idx, window)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.config.batch_size)
+
+        async def pump(side: int, source: Any) -> None:
+            try:
+                if hasattr(source, "__aiter__"):
+                    async for row in source:
+                        await queue.put((side, row))
+                else:
+                    for row in source:
+                        await queue.put((side, row))
+                        # give the other input and the consumer a chance to run
+                        await asyncio.sleep(0)
+                await queue.put((side, _DONE))
+            except Exception as e:
+                await queue.put((side, e))
+
+        with self._measure() as metrics:
+            tasks = [
+                asyncio.ensure_future(pump(LEFT, left)),
+                asyncio.ensure_future(pump(RIGHT, right)),
+            ]
+            try:
+                remaining = 2
+                while remaining:
+                    side, item = await queue.get()
+                    if item is _DONE:
+                        remaining -= 1
+                        continue
+                    if isinstance(item, Exception):
+                        raise item
+                    for result in state.insert(side, item):
+                        yield result
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                self._record(metrics, state)
+
+    def join(
+        self,
+        dataset1: BaseDataset[T],
+        dataset2: BaseDataset[U],
+        build_key_idx: int,
+        probe_key_idx: int,
+        config: Optional[JoinConfig] = None,
+    ) -> BaseDataset[V]:
+        config = self._resolve_config(config)
+        if config.encode_keys:
+            return join_encoded(
+                self, dataset1, dataset2, build_key_idx, probe_key_idx, config
+            )
+        return BaseDataset[V](
+            rows=list(self.stream(dataset1, dataset2, build_key_idx, probe_key_idx))
+        )
+
+
+if __name__ == "__main__":
+    from dataclasses import dataclass
+
+    @dataclass(slots=True, frozen=True)
+    class Click:
+        ad_id: int
+        user: str
+
+    @dataclass(slots=True, frozen=True)
+    class Impression:
+        ad_id: int
+        cost: float
+
+    @dataclass(slots=True, frozen=True)
+    class Attributed:
+        ad_id: int
+        user: str
+        cost: float
+
+    async def clicks():
+        for i in range(6):
+            await asyncio.sleep(0.01)
+            yield Click(i % 3, f"user_{i}")
+
+    async def main():
+        joiner = SymmetricHashJoinAlgorithm[Click, Impression, Attributed]()
+        impressions = [Impression(i, i * 0.5) for i in range(3)]
+        async for row in joiner.astream(
+            clicks(), impressions, 0, 0, window=JoinWindow(max_rows=100)
+        ):
+            print(row)
+
+    print(SymmetricHashJoinAlgorithm.algorithm_name)
+    asyncio.run(main())
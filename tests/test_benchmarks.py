@@ -0,0 +1,43 @@
+import pytest
+
+from benchmarks.datagen import DISTRIBUTIONS, generate
+from benchmarks.run import ALGORITHMS, compare, run_benchmarks
+from join_algorithms.config import JoinConfig
+
+
+@pytest.mark.parametrize("distribution", list(DISTRIBUTIONS))
+@pytest.mark.parametrize("key_type", ["int", "str"])
+def test_generate_is_reproducible(distribution, key_type):
+    build1, probe1 = generate(distribution, 200, key_type, seed=7)
+    build2, probe2 = generate(distribution, 200, key_type, seed=7)
+
+    assert len(build1.rows) == len(probe1.rows) == 200
+    assert build1.rows == build2.rows
+    assert probe1.rows == probe2.rows
+    assert all(isinstance(row.key, int if key_type == "int" else str) for row in build1)
+
+
+def test_run_benchmarks_and_compare(tmp_path):
+    report = run_benchmarks(
+        list(ALGORITHMS),
+        ["uniform", "many_to_many"],
+        ["int"],
+        [300],
+        repeats=1,
+        config=JoinConfig(num_workers=2, spill_dir=str(tmp_path)),
+        isolate=False,
+    )
+
+    results = report["results"]
+    assert len(results) == 2 * len(ALGORITHMS)
+    for distribution in ("uniform", "many_to_many"):
+        outputs = {
+            r["output_rows"] for r in results if r["distribution"] == distribution
+        }
+        assert len(outputs) == 1
+
+    assert compare(report, report, max_regression=0.0) == []
+    slower = {
+        "results": [{**r, "median_seconds": r["median_seconds"] * 2} for r in results]
+    }
+    assert len(compare(slower, report, max_regression=0.5)) == len(results)
@@ -1,10 +1,40 @@
+import asyncio
+import json
+import logging
+import random
 import pytest
-from dataclasses import dataclass
+from typing import Any
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from multiprocessing import get_context
+from join_algorithms import external_sort_merge_join, key_encoding, sort_merge_join
 from join_algorithms.hash_join import HashJoinAlgorithm
 from join_algorithms.sort_merge_join import SortMergeJoinAlgorithm
 from join_algorithms.parallel_hash_join import ParallelHashJoinAlgorithm
+from join_algorithms.external_sort_merge_join import ExternalSortMergeAlgorithm
+from join_algorithms.grace_hash_join import GraceHashJoinAlgorithm
+from join_algorithms.multi_hash_join import DimensionJoin, MultiHashJoinAlgorithm
+from join_algorithms.symmetric_hash_join import JoinWindow, SymmetricHashJoinAlgorithm
+from join_algorithms.file_dataset import (
+    CsvRows,
+    FixedWidthRows,
+    JsonLinesRows,
+    write_fixed_width,
+)
+from join_algorithms.key_encoding import (
+    KeyDictionary,
+    KeyDictionaryFullError,
+    encode_dataset,
+)
+from join_algorithms.spill import (
+    SpillManager,
+    SpillQuotaExceededError,
+    encode_batch,
+)
 
 from join_algorithms.base import BaseDataset
+from join_algorithms.config import JoinConfig
+from join_algorithms.metrics import collecting_callback, logging_callback
 
 
 @dataclass(frozen=True)
@@ -32,6 +62,8 @@ class AB:
         HashJoinAlgorithm[A, B, AB],
         SortMergeJoinAlgorithm[A, B, AB],
         ParallelHashJoinAlgorithm[A, B, AB],
+        MultiHashJoinAlgorithm[A, B, AB],
+        SymmetricHashJoinAlgorithm[A, B, AB],
     ],
 )
 def test_basic_join(JoinClass):
@@ -75,6 +107,8 @@ def test_basic_join(JoinClass):
         HashJoinAlgorithm[A, B, AB],
         SortMergeJoinAlgorithm[A, B, AB],
         ParallelHashJoinAlgorithm[A, B, AB],
+        MultiHashJoinAlgorithm[A, B, AB],
+        SymmetricHashJoinAlgorithm[A, B, AB],
     ],
 )
 def test_empty_datasets(JoinClass):
@@ -93,6 +127,8 @@ def test_empty_datasets(JoinClass):
         HashJoinAlgorithm[A, B, AB],
         SortMergeJoinAlgorithm[A, B, AB],
         ParallelHashJoinAlgorithm[A, B, AB],
+        MultiHashJoinAlgorithm[A, B, AB],
+        SymmetricHashJoinAlgorithm[A, B, AB],
     ],
 )
 def test_invalid_key_index(JoinClass):
@@ -105,3 +141,830 @@ def test_invalid_key_index(JoinClass):
 
     with pytest.raises(IndexError):
         joiner.join(dataset1, dataset2, build_key_idx=0, probe_key_idx=5)
+
+
+@pytest.mark.parametrize("num_workers", [1, 2])
+@pytest.mark.parametrize("merge_partitions", [1, 3])
+@pytest.mark.parametrize("codec", ["none", "zlib"])
+def test_external_sort_merge_parallel(tmp_path, num_workers, merge_partitions, codec):
+    config = JoinConfig(
+        memory_limit_bytes=600,
+        num_workers=num_workers,
+        merge_partitions=merge_partitions,
+        spill_dir=str(tmp_path),
+        batch_size=2,
+        codec=codec,
+    )
+
+    dataset1 = BaseDataset[A](rows=[A(i % 7, f"name_{i}") for i in range(20)])
+    dataset2 = BaseDataset[B](rows=[B(i % 5, float(i)) for i in range(17)])
+
+    if num_workers > 1:
+        executor = ProcessPoolExecutor(num_workers, mp_context=get_context("spawn"))
+    else:
+        executor = None
+    try:
+        result = ExternalSortMergeAlgorithm[A, B, AB](config, executor=executor).join(
+            dataset1, dataset2, build_key_idx=0, probe_key_idx=0
+        )
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    expected = HashJoinAlgorithm[A, B, AB]().join(
+        dataset1, dataset2, build_key_idx=0, probe_key_idx=0
+    )
+
+    assert sorted(result.rows, key=str) == sorted(expected.rows, key=str)
+    assert [row.id for row in result.rows] == sorted(row.id for row in result.rows)
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize("merge_partitions", [1, 4, 8])
+def test_external_sort_merge_reads_only_overlapping_batches(
+    tmp_path, monkeypatch, merge_partitions
+):
+    decoded = []
+    read_batch = external_sort_merge_join.read_batch
+
+    def counting_read_batch(f, codec="none"):
+        rows = read_batch(f, codec)
+        decoded.append(len(rows or ()))
+        return rows
+
+    monkeypatch.setattr(external_sort_merge_join, "read_batch", counting_read_batch)
+    batch_size = 20
+    config = JoinConfig(
+        memory_limit_bytes=20_000,
+        num_workers=1,
+        merge_partitions=merge_partitions,
+        spill_dir=str(tmp_path),
+        batch_size=batch_size,
+    )
+    rows = 2000
+    dataset1 = BaseDataset[A](rows=[A((i * 7919) % 500, f"n{i}") for i in range(rows)])
+    dataset2 = BaseDataset[B](rows=[B((i * 104729) % 500, 1.0) for i in range(rows)])
+    callback, collected = collecting_callback()
+
+    result = ExternalSortMergeAlgorithm[A, B, AB](config, on_metrics=callback).join(
+        dataset1, dataset2, 0, 0
+    )
+    expected = HashJoinAlgorithm[A, B, AB]().join(dataset1, dataset2, 0, 0)
+    assert sorted(result.rows, key=str) == sorted(expected.rows, key=str)
+
+    if merge_partitions > 1:
+        runs = collected[-1].counters["sorted_runs"]
+        # each range boundary can split at most one batch per run
+        limit = 2 * rows + (merge_partitions - 1) * runs * batch_size
+        assert runs > 1 and sum(decoded) <= limit
+
+
+def test_external_sort_merge_merges_many_runs_down(tmp_path):
+    # far more runs than are merged at once, with keys repeated across runs
+    config = JoinConfig(
+        memory_limit_bytes=2000, merge_partitions=1, spill_dir=str(tmp_path)
+    )
+    dataset1 = BaseDataset[A](rows=[A((i * 37) % 300, f"n{i}") for i in range(3000)])
+    dataset2 = BaseDataset[B](rows=[B((i * 11) % 450, float(i)) for i in range(900)])
+    callback, collected = collecting_callback()
+
+    result = ExternalSortMergeAlgorithm[A, B, AB](config, on_metrics=callback).join(
+        dataset1, dataset2, 0, 0
+    )
+
+    expected = HashJoinAlgorithm[A, B, AB]().join(dataset1, dataset2, 0, 0)
+    assert sorted(result.rows, key=str) == sorted(expected.rows, key=str)
+    assert [row.id for row in result.rows] == sorted(row.id for row in result.rows)
+    counters = collected[-1].counters
+    assert counters["merge_passes"] >= 2
+    assert counters["build_rows"] == 3000 and counters["probe_rows"] == 900
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_external_sort_merge_key_ranges_use_the_callers_config(tmp_path, monkeypatch):
+    monkeypatch.setenv("JOIN_ENCODE_KEYS", "1")
+
+    def no_encoding(*args, **kwargs):
+        raise AssertionError("a key range was joined with the environment's config")
+
+    monkeypatch.setattr(sort_merge_join, "join_encoded", no_encoding)
+    config = JoinConfig(
+        encode_keys=False,
+        merge_partitions=3,
+        memory_limit_bytes=600,
+        spill_dir=str(tmp_path),
+    )
+    dataset1 = BaseDataset[A](rows=[A(i % 7, f"name_{i}") for i in range(20)])
+    dataset2 = BaseDataset[B](rows=[B(i % 5, float(i)) for i in range(17)])
+
+    result = ExternalSortMergeAlgorithm[A, B, AB](config).join(dataset1, dataset2, 0, 0)
+
+    expected = HashJoinAlgorithm[A, B, AB](config).join(dataset1, dataset2, 0, 0)
+    assert sorted(result.rows, key=str) == sorted(expected.rows, key=str)
+
+
+@pytest.mark.parametrize(
+    "JoinClass", [GraceHashJoinAlgorithm, ExternalSortMergeAlgorithm]
+)
+def test_concurrent_spilling_joins(tmp_path, JoinClass):
+    config = JoinConfig(spill_dir=str(tmp_path), memory_limit_bytes=2000, batch_size=4)
+
+    def run(offset):
+        dataset1 = BaseDataset[A](rows=[A(i + offset, f"n{i}") for i in range(50)])
+        dataset2 = BaseDataset[B](rows=[B(i + offset, float(i)) for i in range(50)])
+        return JoinClass[A, B, AB](config).join(dataset1, dataset2, 0, 0).rows
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(run, [0, 1000, 2000, 3000]))
+
+    for offset, rows in zip([0, 1000, 2000, 3000], results):
+        assert sorted(row.id for row in rows) == [i + offset for i in range(50)]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_spill_manager_quota_and_cleanup(tmp_path):
+    quota = len(encode_batch([1]))
+    with pytest.raises(SpillQuotaExceededError):
+        with SpillManager(base_dir=str(tmp_path), quota_bytes=quota) as spill:
+            f = spill.open("partition.tmp", "wb+")
+            spill.write_batch(f, [1])
+            assert spill.spilled_bytes == f.tell() == spill.quota_bytes
+            spill.write_batch(f, [2])
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_spill_quota_checked_before_writing(tmp_path):
+    with SpillManager(base_dir=str(tmp_path), quota_bytes=100) as spill:
+        f = spill.open("partition.tmp", "wb+")
+        spill.write_batch(f, [1])
+        with pytest.raises(SpillQuotaExceededError):
+            spill.write_batch(f, list(range(100)))
+        assert f.tell() == spill.spilled_bytes <= 100
+
+
+@pytest.mark.parametrize(
+    "JoinClass", [GraceHashJoinAlgorithm, ExternalSortMergeAlgorithm]
+)
+def test_spill_quota_exceeded(tmp_path, JoinClass):
+    config = JoinConfig(spill_dir=str(tmp_path), spill_quota_bytes=16, batch_size=1)
+
+    dataset1 = BaseDataset[A](rows=[A(i, f"name_{i}") for i in range(50)])
+    dataset2 = BaseDataset[B](rows=[B(i, float(i)) for i in range(50)])
+
+    with pytest.raises(SpillQuotaExceededError):
+        JoinClass[A, B, AB]().join(dataset1, dataset2, 0, 0, config=config)
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize(
+    "JoinClass",
+    [
+        HashJoinAlgorithm,
+        SortMergeJoinAlgorithm,
+        ParallelHashJoinAlgorithm,
+        GraceHashJoinAlgorithm,
+        ExternalSortMergeAlgorithm,
+    ],
+)
+def test_join_config_threaded_through(tmp_path, JoinClass):
+    config = JoinConfig(
+        memory_limit_bytes=300,
+        num_partitions=3,
+        num_workers=2,
+        spill_dir=str(tmp_path),
+        batch_size=2,
+    )
+    dataset1 = BaseDataset[A](rows=[A(i % 4, f"name_{i}") for i in range(12)])
+    dataset2 = BaseDataset[B](rows=[B(i % 6, float(i)) for i in range(12)])
+
+    joiner = JoinClass[A, B, AB](config)
+    assert joiner.config is config
+    result = joiner.join(dataset1, dataset2, 0, 0)
+
+    expected = HashJoinAlgorithm[A, B, AB]().join(dataset1, dataset2, 0, 0)
+    assert sorted(result.rows, key=str) == sorted(expected.rows, key=str)
+
+
+def test_join_config_validation_and_env_overrides():
+    with pytest.raises(ValueError):
+        JoinConfig(num_workers=0)
+    with pytest.raises(ValueError):
+        JoinConfig(codec="snappy")
+    with pytest.raises(ValueError):
+        JoinConfig(spill_quota_bytes=-1)
+    with pytest.raises(ValueError):
+        JoinConfig(encode_keys="yes")
+
+    config = JoinConfig.from_env(
+        environ={
+            "JOIN_NUM_PARTITIONS": "8",
+            "JOIN_SPILL_DIR": "/tmp/spill",
+            "JOIN_CODEC": "zlib",
+            "JOIN_ENCODE_KEYS": "true",
+        }
+    )
+    assert config.num_partitions == 8
+    assert config.encode_keys is True
+    assert config.resolved_spill_dir == "/tmp/spill"
+    assert config.codec == "zlib"
+
+    with pytest.raises(ValueError):
+        JoinConfig.from_env(environ={"JOIN_BATCH_SIZE": "lots"})
+    with pytest.raises(ValueError):
+        JoinConfig.from_env(environ={"JOIN_ENCODE_KEYS": "maybe"})
+
+
+def test_parameterized_classes_are_cached():
+    assert HashJoinAlgorithm[A, B, AB] is HashJoinAlgorithm[A, B, AB]
+    assert HashJoinAlgorithm[A, B, AB] is not SortMergeJoinAlgorithm[A, B, AB]
+    assert repr(HashJoinAlgorithm[A, B, AB]) == (
+        "<class 'join_algorithms.hash_join.HashJoinAlgorithm'>"
+    )
+
+    grace = GraceHashJoinAlgorithm[A, B, AB]()
+    nested1 = grace._make_joiner(HashJoinAlgorithm)
+    nested2 = grace._make_joiner(HashJoinAlgorithm)
+    assert type(nested1) is type(nested2) is HashJoinAlgorithm[A, B, AB]
+    assert nested1._result_type is AB
+
+
+def test_unparameterized_join_uses_row_types():
+    joiner = HashJoinAlgorithm()
+    result = joiner.join(
+        BaseDataset[A](rows=[A(1, "Alice")]), BaseDataset[B](rows=[B(1, 10.0)]), 0, 0
+    )
+    assert result.rows == [(1, "Alice", 10.0)]
+
+
+@pytest.mark.parametrize(
+    "JoinClass, phases",
+    [
+        (HashJoinAlgorithm, {"build", "probe"}),
+        (SortMergeJoinAlgorithm, {"sort", "merge"}),
+        (ParallelHashJoinAlgorithm, {"partition", "build", "probe"}),
+        (GraceHashJoinAlgorithm, {"partition", "spill_read", "build", "probe"}),
+        (ExternalSortMergeAlgorithm, {"sort", "merge"}),
+    ],
+)
+def test_join_metrics(tmp_path, JoinClass, phases):
+    config = JoinConfig(num_workers=2, spill_dir=str(tmp_path), memory_limit_bytes=500)
+    callback, collected = collecting_callback()
+    dataset1 = BaseDataset[A](rows=[A(i % 4, f"name_{i}") for i in range(12)])
+    dataset2 = BaseDataset[B](rows=[B(i % 6, float(i)) for i in range(12)])
+
+    result = JoinClass[A, B, AB](config, on_metrics=callback).join(
+        dataset1, dataset2, 0, 0
+    )
+
+    assert len(collected) == 1
+    metrics = collected[0]
+    assert metrics.algorithm == JoinClass.algorithm_name
+    assert phases | {"total"} <= set(metrics.phase_seconds)
+    assert metrics.counters["build_rows"] == 12
+    assert metrics.counters["probe_rows"] == 12
+    assert metrics.counters["output_rows"] == len(result.rows)
+    if JoinClass in (GraceHashJoinAlgorithm, ExternalSortMergeAlgorithm):
+        assert metrics.counters["spilled_bytes"] > 0
+    if JoinClass is ParallelHashJoinAlgorithm:
+        assert set(metrics.workers) == {0, 1}
+        assert metrics.worker_skew >= 1.0
+
+
+def test_logging_metrics_callback(caplog):
+    joiner = HashJoinAlgorithm[A, B, AB](on_metrics=logging_callback())
+    with caplog.at_level(logging.INFO, logger="join_algorithms.metrics"):
+        joiner.join(
+            BaseDataset[A](rows=[A(1, "Alice")]), BaseDataset[B](rows=[B(1, 1.0)]), 0, 0
+        )
+    assert "Hash Join" in caplog.text
+    assert "output_rows" in caplog.text
+
+
+@dataclass(frozen=True)
+class Sale:
+    id: int
+    customer_id: int
+    product_id: int
+
+
+@dataclass(frozen=True)
+class Customer:
+    id: int
+    name: str
+
+
+@dataclass(frozen=True)
+class Product:
+    id: int
+    title: str
+
+
+@dataclass(frozen=True)
+class SaleCustomer:
+    id: int
+    customer_id: int
+    product_id: int
+    name: str
+
+
+@dataclass(frozen=True)
+class SaleDetail:
+    id: int
+    customer_id: int
+    product_id: int
+    name: str
+    title: str
+
+
+@pytest.mark.parametrize("encode_keys", [False, True])
+@pytest.mark.parametrize("reorder", [False, True])
+def test_multi_hash_join_matches_chained_joins(reorder, encode_keys):
+    sales = BaseDataset[Sale](rows=[Sale(i, i % 5, i % 3) for i in range(30)])
+    customers = BaseDataset[Customer](
+        rows=[Customer(0, "Alice"), Customer(1, "Bob"), Customer(1, "Bobby")]
+    )
+    products = BaseDataset[Product](rows=[Product(i, f"p{i}") for i in range(3)])
+
+    with_customers = HashJoinAlgorithm[Sale, Customer, SaleCustomer]().join(
+        sales, customers, 1, 0
+    )
+    expected = HashJoinAlgorithm[SaleCustomer, Product, SaleDetail]().join(
+        with_customers, products, 2, 0
+    )
+
+    joiner = MultiHashJoinAlgorithm[Sale, Any, SaleDetail]()
+    result = joiner.join_many(
+        sales,
+        [DimensionJoin(customers, 1, 0), (products, 2, 0)],
+        reorder=reorder,
+        config=JoinConfig(encode_keys=encode_keys),
+    )
+
+    assert sorted(result.rows, key=str) == sorted(expected.rows, key=str)
+
+
+def test_multi_hash_join_reorders_by_selectivity():
+    sales = BaseDataset[Sale](rows=[Sale(i, i % 5, i % 3) for i in range(30)])
+    customers = BaseDataset[Customer](rows=[Customer(i, f"c{i}") for i in range(5)])
+    products = BaseDataset[Product](rows=[Product(0, "Pen")])
+
+    joiner = MultiHashJoinAlgorithm[Sale, Any, SaleDetail]()
+    result = joiner.join_many(
+        sales, [(customers, 1, 0), (products, 2, 0)], reorder=True
+    )
+
+    assert joiner.probe_order == [1, 0]
+    assert len(result.rows) == 10
+    for row in result.rows:
+        assert row.title == "Pen"
+        assert row.name == f"c{row.customer_id}"
+
+
+def test_symmetric_hash_join_emits_results_incrementally():
+    joiner = SymmetricHashJoinAlgorithm[A, B, AB]()
+    left = iter([A(1, "Alice"), A(2, "Bob")])
+    right = iter([B(1, 10.0), B(3, 30.0), B(2, 20.0)])
+
+    stream = joiner.stream(left, right, 0, 0)
+    # A(1) arrives, then B(1) matches it before the rest of either input is read
+    assert next(stream) == AB(1, "Alice", 10.0)
+    assert list(stream) == [AB(2, "Bob", 20.0)]
+
+
+def test_symmetric_hash_join_windows():
+    joiner = SymmetricHashJoinAlgorithm[A, B, AB]()
+    left = [A(i, f"name_{i}") for i in range(10)]
+    right = [B(i, float(i)) for i in reversed(range(10))]
+
+    # only the two most recent rows per side can match
+    result = list(joiner.stream(left, right, 0, 0, window=JoinWindow(max_rows=2)))
+    assert result == [AB(5, "name_5", 5.0), AB(4, "name_4", 4.0)]
+
+    # event time is the row's value; rows more than 5 seconds apart never meet
+    window = JoinWindow(max_age_seconds=5, timestamp=lambda row: row.value)
+    left = [B(1, 0.0), B(1, 10.0)]
+    right = [B(1, 1.0), B(1, 11.0)]
+    result = list(
+        SymmetricHashJoinAlgorithm().stream(left, right, 0, 0, window=window)
+    )
+    assert result == [(1, 0.0, 1.0), (1, 10.0, 11.0)]
+
+    with pytest.raises(ValueError):
+        JoinWindow(max_rows=0)
+
+
+def test_symmetric_hash_join_windows_out_of_order():
+    window = JoinWindow(max_age_seconds=5, timestamp=lambda row: row.value)
+    callback, collected = collecting_callback()
+    joiner = SymmetricHashJoinAlgorithm(on_metrics=callback)
+
+    # the right row arrives 50 seconds late and must not meet the left one
+    result = list(joiner.stream([B(1, 100.0)], [B(1, 50.0)], 0, 0, window=window))
+    assert result == []
+    assert collected[-1].counters["late_rows"] == 1
+
+    # 96.0 is accepted after 100.0 and stays queued behind it, but must not meet
+    # 102.0, which is 6 seconds away
+    left = [B(1, 100.0), B(1, 96.0)]
+    right = [B(1, 99.0), B(1, 102.0)]
+    result = list(joiner.stream(left, right, 0, 0, window=window))
+    assert sorted(result) == sorted(
+        [(1, 100.0, 99.0), (1, 96.0, 99.0), (1, 100.0, 102.0)]
+    )
+
+
+def test_symmetric_hash_join_async():
+    async def clicks():
+        for i in range(6):
+            await asyncio.sleep(0)
+            yield A(i % 3, f"name_{i}")
+
+    async def collect():
+        joiner = SymmetricHashJoinAlgorithm[A, B, AB]()
+        return [
+            row
+            async for row in joiner.astream(
+                clicks(), [B(i, float(i)) for i in range(3)], 0, 0
+            )
+        ]
+
+    result = asyncio.run(collect())
+    assert sorted(result, key=str) == sorted(
+        [AB(i % 3, f"name_{i}", float(i % 3)) for i in range(6)], key=str
+    )
+
+
+def test_symmetric_hash_join_async_propagates_errors():
+    async def broken():
+        yield A(1, "Alice")
+        raise RuntimeError("source failed")
+
+    async def collect():
+        joiner = SymmetricHashJoinAlgorithm[A, B, AB]()
+        return [row async for row in joiner.astream(broken(), [B(1, 1.0)], 0, 0)]
+
+    with pytest.raises(RuntimeError, match="source failed"):
+        asyncio.run(collect())
+
+
+@dataclass(frozen=True)
+class Reading:
+    sensor: str
+    time: int
+
+
+@dataclass(frozen=True)
+class Event:
+    name: str
+    time: int
+
+
+@dataclass(frozen=True)
+class ReadingEvent:
+    sensor: str
+    reading_time: int
+    name: str
+    event_time: int
+
+
+@dataclass(frozen=True)
+class Span:
+    name: str
+    start: int
+    end: int
+
+
+@dataclass(frozen=True)
+class SpanPair:
+    left: str
+    left_start: int
+    left_end: int
+    right: str
+    right_start: int
+    right_end: int
+
+
+def test_band_join_matches_nested_loop():
+    rng = random.Random(7)
+    readings = [Reading(f"r{i}", rng.randrange(100)) for i in range(200)]
+    events = [Event(f"e{i}", rng.randrange(100)) for i in range(150)]
+    callback, collected = collecting_callback()
+    joiner = SortMergeJoinAlgorithm[Reading, Event, ReadingEvent](on_metrics=callback)
+
+    result = joiner.band_join(
+        BaseDataset[Reading](rows=readings),
+        BaseDataset[Event](rows=events),
+        build_key_idx=1,
+        probe_key_idx=1,
+        before=2,
+        after=5,
+    )
+    expected = [
+        ReadingEvent(r.sensor, r.time, e.name, e.time)
+        for r in readings
+        for e in events
+        if e.time - 2 <= r.time <= e.time + 5
+    ]
+    assert sorted(result.rows, key=str) == sorted(expected, key=str)
+    assert collected[-1].counters["output_rows"] == len(expected)
+    assert {"sort", "merge"} <= set(collected[-1].phase_seconds)
+
+
+def test_interval_join_matches_nested_loop():
+    rng = random.Random(11)
+
+    def spans(prefix, n):
+        rows = []
+        for i in range(n):
+            start = rng.randrange(1000)
+            rows.append(Span(f"{prefix}{i}", start, start + rng.randrange(30)))
+        return rows
+
+    left, right = spans("l", 300), spans("r", 250)
+    # touching endpoints overlap since the intervals are closed
+    left.append(Span("edge", 2000, 2010))
+    right.append(Span("edge", 2010, 2020))
+    joiner = SortMergeJoinAlgorithm[Span, Span, SpanPair]()
+
+    result = joiner.interval_join(
+        BaseDataset[Span](rows=left), BaseDataset[Span](rows=right), (1, 2), (1, 2)
+    )
+    expected = [
+        SpanPair(a.name, a.start, a.end, b.name, b.start, b.end)
+        for a in left
+        for b in right
+        if a.start <= b.end and b.start <= a.end
+    ]
+    assert sorted(result.rows, key=str) == sorted(expected, key=str)
+    assert SpanPair("edge", 2000, 2010, "edge", 2010, 2020) in result.rows
+
+
+def test_range_joins_reject_encoded_keys():
+    config = JoinConfig(encode_keys=True)
+    band_joiner = SortMergeJoinAlgorithm[Reading, Event, ReadingEvent](config)
+    interval_joiner = SortMergeJoinAlgorithm[Span, Span, SpanPair]()
+    readings = BaseDataset[Reading](rows=[Reading("r", 1)])
+    events = BaseDataset[Event](rows=[Event("e", 1)])
+    spans = BaseDataset[Span](rows=[Span("s", 1, 2)])
+
+    with pytest.raises(ValueError, match="encode_keys"):
+        band_joiner.band_join(readings, events, 1, 1, before=0, after=0)
+    with pytest.raises(ValueError, match="encode_keys"):
+        interval_joiner.interval_join(spans, spans, (1, 2), (1, 2), config=config)
+    # a per-call config overrides the joiner's
+    plain = config.replace(encode_keys=False)
+    result = band_joiner.band_join(readings, events, 1, 1, 0, 0, config=plain)
+    assert len(result.rows) == 1
+
+
+@pytest.mark.parametrize(
+    "JoinClass",
+    [
+        HashJoinAlgorithm[A, B, AB],
+        SortMergeJoinAlgorithm[A, B, AB],
+        ParallelHashJoinAlgorithm[A, B, AB],
+        GraceHashJoinAlgorithm[A, B, AB],
+        ExternalSortMergeAlgorithm[A, B, AB],
+        MultiHashJoinAlgorithm[A, B, AB],
+        SymmetricHashJoinAlgorithm[A, B, AB],
+    ],
+)
+@pytest.mark.parametrize("probe_format", ["csv", "jsonl"])
+def test_file_backed_datasets(tmp_path, JoinClass, probe_format):
+    a_rows = [A(i % 50, f"name_{i}") for i in range(300)]
+    b_rows = [B(i, i * 0.5) for i in range(25, 75)]
+    a_path = str(tmp_path / "a.bin")
+    assert write_fixed_width(a_path, a_rows, "<q12s") == len(a_rows)
+
+    b_path = tmp_path / f"b.{probe_format}"
+    if probe_format == "csv":
+        b_path.write_text("id,value\n" + "".join(f"{b.id},{b.value}\n" for b in b_rows))
+        probe_rows = CsvRows(str(b_path), B, batch_size=7)
+    else:
+        b_path.write_text("".join(json.dumps(asdict(b)) + "\n" for b in b_rows))
+        probe_rows = JsonLinesRows(str(b_path), B, batch_size=7)
+
+    config = JoinConfig(
+        spill_dir=str(tmp_path / "spill"), memory_limit_bytes=4096, num_workers=2
+    )
+    with FixedWidthRows(a_path, A, "<q12s", batch_size=16) as build_rows:
+        assert len(build_rows) == len(a_rows) and probe_rows.count() == len(b_rows)
+        assert build_rows[-1] == a_rows[-1] and list(build_rows) == a_rows
+        assert list(build_rows.keys(0)) == [a.id for a in a_rows]
+
+        result = JoinClass(config).join(
+            BaseDataset[A](rows=build_rows), BaseDataset[B](rows=probe_rows), 0, 0
+        )
+
+    expected = HashJoinAlgorithm[A, B, AB]().join(
+        BaseDataset[A](rows=a_rows), BaseDataset[B](rows=b_rows), 0, 0
+    )
+    assert sorted(result.rows, key=str) == sorted(expected.rows, key=str)
+
+
+@pytest.mark.parametrize(
+    "JoinClass", [HashJoinAlgorithm[A, B, AB], SortMergeJoinAlgorithm[A, B, AB]]
+)
+def test_line_rows_are_scanned_once(tmp_path, monkeypatch, JoinClass):
+    scans = []
+    records = CsvRows._records
+    monkeypatch.setattr(
+        CsvRows, "_records", lambda self, f: scans.append(self.path) or records(self, f)
+    )
+    a_path, b_path = tmp_path / "a.csv", tmp_path / "b.csv"
+    a_path.write_text("id,name\n" + "".join(f"{i},n{i}\n" for i in range(20)))
+    b_path.write_text("id,value\n" + "".join(f"{i},{i}.5\n" for i in range(10)))
+    callback, collected = collecting_callback()
+
+    a_rows, b_rows = CsvRows(str(a_path), A), CsvRows(str(b_path), B)
+    result = JoinClass(on_metrics=callback).join(
+        BaseDataset[A](rows=a_rows), BaseDataset[B](rows=b_rows), 0, 0
+    )
+    assert len(result.rows) == 10
+    assert sorted(scans) == sorted([str(a_path), str(b_path)])
+    assert collected[-1].counters["build_rows"] == 20
+    assert collected[-1].counters["probe_rows"] == 10
+    # the completed pass also counted the rows
+    assert a_rows.count() == 20 and len(scans) == 2
+
+    # file-backed datasets are truthy and convert to lists in a single scan
+    dataset = BaseDataset[A](rows=a_rows)
+    assert dataset and len(list(dataset)) == 20 and len(scans) == 3
+
+
+def test_fixed_width_rows_validation(tmp_path):
+    path = tmp_path / "a.bin"
+    path.write_bytes(b"\0" * 10)
+    with pytest.raises(ValueError, match="fields"):
+        FixedWidthRows(str(path), A, "<q")
+    with pytest.raises(ValueError, match="record size"):
+        FixedWidthRows(str(path), A, "<q4s")
+
+    path.write_bytes(b"")
+    with FixedWidthRows(str(path), A, "<q4s") as rows:
+        assert len(rows) == 0 and list(rows) == []
+
+
+@dataclass(frozen=True)
+class StrA:
+    id: str
+    name: str
+
+
+@dataclass(frozen=True)
+class StrB:
+    id: str
+    value: float
+
+
+@dataclass(frozen=True)
+class StrAB:
+    id: str
+    name: str
+    value: float
+
+
+def _string_key_datasets():
+    prefix = "customer-" + "x" * 40
+    dataset1 = BaseDataset[StrA](
+        rows=[StrA(f"{prefix}{i % 40}", f"name_{i}") for i in range(200)]
+    )
+    dataset2 = BaseDataset[StrB](
+        rows=[StrB(f"{prefix}{i}", i * 0.5) for i in range(20, 60)]
+    )
+    return dataset1, dataset2
+
+
+@pytest.mark.parametrize(
+    "JoinClass",
+    [
+        HashJoinAlgorithm[StrA, StrB, StrAB],
+        SortMergeJoinAlgorithm[StrA, StrB, StrAB],
+        ParallelHashJoinAlgorithm[StrA, StrB, StrAB],
+        GraceHashJoinAlgorithm[StrA, StrB, StrAB],
+        ExternalSortMergeAlgorithm[StrA, StrB, StrAB],
+        MultiHashJoinAlgorithm[StrA, StrB, StrAB],
+        SymmetricHashJoinAlgorithm[StrA, StrB, StrAB],
+        # no result type, so the results are plain tuples
+        HashJoinAlgorithm,
+        SortMergeJoinAlgorithm,
+        GraceHashJoinAlgorithm,
+    ],
+)
+def test_encoded_keys_match_plain_join(tmp_path, JoinClass):
+    dataset1, dataset2 = _string_key_datasets()
+    config = JoinConfig(
+        spill_dir=str(tmp_path), memory_limit_bytes=4096, num_workers=2
+    )
+    plain = JoinClass(config).join(dataset1, dataset2, 0, 0)
+    encoded = JoinClass(config.replace(encode_keys=True)).join(
+        dataset1, dataset2, 0, 0
+    )
+    assert len(plain.rows) == 100
+    assert sorted(encoded.rows, key=str) == sorted(plain.rows, key=str)
+
+
+@pytest.mark.parametrize(
+    "JoinClass",
+    [
+        GraceHashJoinAlgorithm[StrA, StrB, StrAB],
+        ExternalSortMergeAlgorithm[StrA, StrB, StrAB],
+    ],
+)
+def test_encoded_keys_shrink_spill_files(tmp_path, JoinClass):
+    dataset1, dataset2 = _string_key_datasets()
+    callback, collected = collecting_callback()
+    config = JoinConfig(spill_dir=str(tmp_path), memory_limit_bytes=4096)
+    joiner = JoinClass(config, on_metrics=callback)
+
+    joiner.join(dataset1, dataset2, 0, 0)
+    joiner.join(dataset1, dataset2, 0, 0, config=config.replace(encode_keys=True))
+    plain, encoded = collected
+    assert encoded.counters["spilled_bytes"] < plain.counters["spilled_bytes"]
+
+
+def test_key_dictionary_is_shared_between_inputs():
+    dataset1, dataset2 = _string_key_datasets()
+    dictionary = KeyDictionary()
+    codes1 = [row.id for row in encode_dataset(dataset1, 0, dictionary)]
+    codes2 = [row.id for row in encode_dataset(dataset2, 0, dictionary)]
+
+    assert sorted(set(codes1) | set(codes2)) == list(range(len(dictionary)))
+    assert len(dictionary) == 60
+    for row, code in zip(dataset2, codes2):
+        assert dictionary.decode(code) == row.id
+    # re-encoding reuses the existing codes
+    assert [row.id for row in encode_dataset(dataset1, 0, dictionary)] == codes1
+
+
+@dataclass(frozen=True)
+class CheckedA:
+    id: str
+    name: str
+    label: str = field(init=False)
+
+    def __post_init__(self):
+        if not isinstance(self.id, str):
+            raise TypeError("id must be a string")
+        object.__setattr__(self, "label", self.name.upper())
+
+
+@dataclass(frozen=True)
+class CheckedAB:
+    id: str
+    name: str
+    label: str
+    value: float
+
+
+def test_encoded_keys_skip_row_validation():
+    dataset1, dataset2 = _string_key_datasets()
+    checked = BaseDataset[CheckedA](rows=[CheckedA(a.id, a.name) for a in dataset1])
+    joiner = HashJoinAlgorithm[CheckedA, StrB, CheckedAB]()
+
+    plain = joiner.join(checked, dataset2, 0, 0)
+    encoded = joiner.join(checked, dataset2, 0, 0, JoinConfig(encode_keys=True))
+    assert encoded.rows[0].label == encoded.rows[0].name.upper()
+    assert sorted(encoded.rows, key=str) == sorted(plain.rows, key=str)
+
+
+def test_parallel_hash_join_encodes_each_row_once(monkeypatch):
+    copies = []
+    replace_fields = key_encoding._replace_fields
+
+    def counting_replace_fields(row, replacements):
+        copies.append(row)
+        return replace_fields(row, replacements)
+
+    monkeypatch.setattr(key_encoding, "_replace_fields", counting_replace_fields)
+    dataset1, dataset2 = _string_key_datasets()
+    config = JoinConfig(encode_keys=True, num_workers=4)
+
+    result = ParallelHashJoinAlgorithm[StrA, StrB, StrAB](config).join(
+        dataset1, dataset2, 0, 0
+    )
+
+    # every input row is encoded and every result row decoded exactly once
+    assert len(copies) == len(dataset1.rows) + len(dataset2.rows) + len(result.rows)
+
+
+def test_encoded_keys_fall_back_past_max_keys(caplog):
+    dataset1, dataset2 = _string_key_datasets()
+    joiner = HashJoinAlgorithm[StrA, StrB, StrAB]()
+    plain = joiner.join(dataset1, dataset2, 0, 0)
+
+    with caplog.at_level(logging.WARNING, logger="join_algorithms.key_encoding"):
+        result = joiner.join(
+            dataset1,
+            dataset2,
+            0,
+            0,
+            JoinConfig(encode_keys=True, max_encoded_keys=10),
+        )
+    assert sorted(result.rows, key=str) == sorted(plain.rows, key=str)
+    assert "plain keys" in caplog.text
+
+    dictionary = KeyDictionary(max_keys=2)
+    dictionary.encode("a"), dictionary.encode("b"), dictionary.encode("a")
+    with pytest.raises(KeyDictionaryFullError):
+        dictionary.encode("c")